@@ -41,6 +41,7 @@ INSTALLED_APPS = [
     'corsheaders',
     'drf_yasg',
     
+    'core',
     'books',
     'characters',
     'houses',
@@ -50,7 +51,11 @@ INSTALLED_APPS = [
 REQUIRE_AUTHENTICATION = os.getenv('REQUIRE_AUTHENTICATION', 'True') == 'True'
 
 REST_FRAMEWORK = {
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_PAGINATION_CLASS': 'core.pagination.HybridPagination',
+    'DEFAULT_FILTER_BACKENDS': [
+        'core.filters.FieldFilterBackend',
+        'core.filters.SearchFilterBackend',
+    ],
     'PAGE_SIZE': 10
 }
 
@@ -110,6 +115,15 @@ DATABASES = {
     }
 }
 
+# Cache das respostas da API; use a FileBasedCache para dividir entre processos
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', 'got-api'),
+    }
+}
+API_CACHE_TIMEOUT = int(os.getenv('API_CACHE_TIMEOUT', 60 * 60))
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -135,6 +149,25 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# Cache em disco das capas baixadas pelo populate_db
+COVER_CACHE_DIR = Path(os.getenv('COVER_CACHE_DIR', BASE_DIR / 'cache' / 'covers'))
+COVER_CACHE_MAX_AGE = int(os.getenv('COVER_CACHE_MAX_AGE', 7 * 24 * 60 * 60))
+# Tamanhos e formatos das capas renderizadas, gerados na importação
+COVER_VARIANTS_DIR = Path(os.getenv('COVER_VARIANTS_DIR', BASE_DIR / 'cache' / 'variants'))
+# Pool de processos que renderiza capas durante as requisições: com os
+# workers ocupados e a fila cheia por COVER_RENDER_MAX_WAIT segundos, ou com o
+# render passando de COVER_RENDER_TIMEOUT segundos, responde 503
+COVER_RENDER_WORKERS = int(os.getenv('COVER_RENDER_WORKERS', 2))
+COVER_RENDER_QUEUE = int(os.getenv('COVER_RENDER_QUEUE', 8))
+COVER_RENDER_MAX_WAIT = float(os.getenv('COVER_RENDER_MAX_WAIT', 2))
+COVER_RENDER_TIMEOUT = float(os.getenv('COVER_RENDER_TIMEOUT', 10))
+COVER_RENDER_RETRY_AFTER = int(os.getenv('COVER_RENDER_RETRY_AFTER', 5))
+# Grafo de relações (characters.graph): a versão dos models é conferida no
+# máximo a cada GRAPH_CHECK_INTERVAL segundos e, se mudou, o índice novo é
+# montado numa thread enquanto o anterior segue respondendo
+GRAPH_CHECK_INTERVAL = float(os.getenv('GRAPH_CHECK_INTERVAL', 1))
+GRAPH_BACKGROUND_REBUILD = os.getenv('GRAPH_BACKGROUND_REBUILD', 'True') == 'True'
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 AUTH_USER_MODEL = 'users.User'
@@ -4,6 +4,7 @@ from rest_framework.routers import DefaultRouter
 from books.views import BookViewSet
 from characters.views import CharacterViewSet
 from houses.views import HouseViewSet
+from core.views import MetricsView
 from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
 from rest_framework import permissions
@@ -30,6 +31,7 @@ router.register(r'houses', HouseViewSet)
 urlpatterns = [
    path('admin/', admin.site.urls),
    path('o/', include('oauth2_provider.urls', namespace='oauth2_provider')),
+   path('api/metrics/', MetricsView.as_view(), name='metrics'),
    path('api/', include(router.urls)),
    path('swagger<format>/', schema_view.without_ui(cache_timeout=0), name='schema-json'),
    path('swagger/', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
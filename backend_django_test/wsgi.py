@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend_django_test.settings')
 
 application = get_wsgi_application()
+
+# Carrega o grafo de relações na subida, para a primeira consulta não pagar a montagem
+from characters.graph import warm  # noqa: E402
+
+warm()
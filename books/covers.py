@@ -0,0 +1,43 @@
+from django.conf import settings
+
+from books import rendering
+from books.models import Book, BookCover
+from core import metrics
+from core.pool import BoundedProcessPool
+
+# Renderização das capas fora do worker da requisição
+render_pool = BoundedProcessPool(
+    settings.COVER_RENDER_WORKERS, settings.COVER_RENDER_QUEUE, settings.COVER_RENDER_MAX_WAIT,
+    timeout=settings.COVER_RENDER_TIMEOUT,
+)
+metrics.register('cover_render', render_pool.stats)
+
+
+def cover_inputs(book_ids):
+    """{book_id: (render_key, título, nomes POV)} dos livros com capa, sem carregar as imagens."""
+    covers = BookCover.objects.filter(book_id__in=book_ids).values_list('book_id', 'sha256', 'book__name')
+    names = {}
+    pov = Book.pov_characters.through.objects.filter(book_id__in=book_ids).order_by('character_id')
+    for book_id, name in pov.values_list('book_id', 'character__name'):
+        names.setdefault(book_id, []).append(name or '')
+    return {
+        book_id: (rendering.render_key(sha256, title, names.get(book_id, [])), title, names.get(book_id, []))
+        for book_id, sha256, title in covers
+    }
+
+
+def ensure_variants(root, book_id, key, title, pov_names, pool=None):
+    """
+    Gera em disco os tamanhos e formatos da capa que ainda não existem,
+    no `pool` se for passado. Retorna True se precisou desenhar a capa.
+    """
+    missing = rendering.missing_variants(root, key)
+    if not missing:
+        return False
+    image_data = bytes(BookCover.objects.filter(book_id=book_id).values_list('image', flat=True).get())
+    args = (root, key, image_data, title, pov_names, missing)
+    if pool is None:
+        rendering.write_variants(*args)
+    else:
+        pool.run(rendering.write_variants, *args)
+    return True
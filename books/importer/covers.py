@@ -0,0 +1,131 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import requests
+
+from books.importer.fetch import TIMEOUT, build_session
+
+COVER_URL = "https://covers.openlibrary.org/b/isbn/{}-L.jpg"
+COVER_WORKERS = 8
+
+
+def write_atomic(path, data):
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix='.tmp-')
+    with os.fdopen(fd, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+class CoverCache:
+    """
+    Cache de capas em disco endereçado por conteúdo: `blobs/<sha256>` guarda
+    cada imagem uma única vez e `index.json` liga cada ISBN ao seu hash e aos
+    validadores HTTP (ETag/Last-Modified) usados para revalidar.
+    Com `offline=True` nada é baixado: usa o que estiver em disco, mesmo
+    vencido, e conta como `skipped` os ISBNs fora do cache.
+    """
+
+    def __init__(self, root, url=COVER_URL, session=None, workers=COVER_WORKERS, max_age=0, offline=False):
+        self.root = Path(root)
+        self.blobs = self.root / 'blobs'
+        self.blobs.mkdir(parents=True, exist_ok=True)
+        self.url = url
+        self.workers = max(1, workers)
+        self.offline = offline
+        self.session = None if offline else session or build_session(pool_size=self.workers)
+        self.max_age = max_age
+        self.lock = threading.Lock()
+        self.stats = {'downloaded': 0, 'revalidated': 0, 'fresh': 0, 'missing': 0, 'skipped': 0, 'errors': 0}
+        try:
+            self.index = json.loads((self.root / 'index.json').read_text())
+        except (OSError, ValueError):
+            self.index = {}
+
+    def save(self):
+        data = json.dumps(self.index, sort_keys=True).encode()
+        write_atomic(self.root / 'index.json', data)
+
+    def read(self, entry):
+        if not entry or not entry.get('sha256'):
+            return None
+        try:
+            return (self.blobs / entry['sha256']).read_bytes()
+        except OSError:
+            return None
+
+    def store(self, content):
+        digest = hashlib.sha256(content).hexdigest()
+        path = self.blobs / digest
+        if not path.exists():
+            write_atomic(path, content)
+        return digest
+
+    def count(self, key):
+        with self.lock:
+            self.stats[key] += 1
+
+    def fetch(self, isbn):
+        """Bytes da capa de `isbn`, baixando só se o cache não estiver válido."""
+        isbn = isbn.replace('-', '')
+        entry = self.index.get(isbn)
+        cached = self.read(entry)
+
+        if entry and (self.offline or time.time() - entry['checked'] < self.max_age):
+            self.count('fresh')
+            return cached
+        if self.offline:
+            self.count('skipped')
+            return None
+
+        headers = {}
+        if cached is not None:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+
+        try:
+            resp = self.session.get(self.url.format(isbn), headers=headers, timeout=TIMEOUT)
+        except requests.RequestException:
+            # Sem rede: usa o que já estiver em disco
+            self.count('errors')
+            return cached
+
+        if resp.status_code == 304 and cached is not None:
+            self.count('revalidated')
+            content = cached
+        elif resp.status_code == 200:
+            self.count('downloaded')
+            content = resp.content
+        else:
+            self.count('missing')
+            content = None
+
+        new_entry = {
+            'sha256': self.store(content) if content is not None else None,
+            'etag': resp.headers.get('ETag') or (entry or {}).get('etag'),
+            'last_modified': resp.headers.get('Last-Modified') or (entry or {}).get('last_modified'),
+            'checked': time.time(),
+        }
+        with self.lock:
+            self.index[isbn] = new_entry
+        return content
+
+    def known_missing(self, isbn):
+        """True se a origem já respondeu que `isbn` não tem capa."""
+        entry = self.index.get((isbn or '').replace('-', ''))
+        return entry is not None and entry['sha256'] is None
+
+    def fetch_many(self, isbns):
+        """Busca várias capas em paralelo; retorna {isbn: bytes ou None}."""
+        isbns = list(dict.fromkeys(i for i in isbns if i))
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            covers = dict(zip(isbns, pool.map(self.fetch, isbns)))
+        self.save()
+        return covers
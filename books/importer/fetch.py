@@ -0,0 +1,119 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+API_BASE = "https://anapioficeandfire.com/api"
+MAX_PAGES = 10
+PAGE_SIZE = 50
+FETCH_WORKERS = 4
+RETRIES = 3
+BACKOFF = 0.5
+TIMEOUT = 30
+
+
+class RequestCounter:
+    """Hook de resposta do requests que conta as requisições HTTP feitas."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.value = 0
+
+    def __call__(self, resp, *args, **kwargs):
+        with self.lock:
+            self.value += 1
+
+
+http_requests = RequestCounter()
+
+
+def build_session(pool_size=FETCH_WORKERS, retries=RETRIES, backoff=BACKOFF):
+    """Sessão HTTP com pool de conexões e retry com backoff exponencial."""
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=('GET', 'HEAD'),
+        respect_retry_after_header=True,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=pool_size,
+        pool_maxsize=pool_size,
+        max_retries=retry,
+    )
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.hooks['response'].append(http_requests)
+    return session
+
+
+def last_page(resp):
+    """Número da última página segundo o header Link, ou None se ausente."""
+    url = resp.links.get('last', {}).get('url')
+    if not url:
+        return None
+    page = parse_qs(urlparse(url).query).get('page')
+    return int(page[0]) if page else None
+
+
+class PageFetcher:
+    """
+    Busca todas as páginas de um recurso da API com no máximo `workers`
+    requisições em paralelo, parando na última página.
+    """
+
+    def __init__(self, base_url=API_BASE, session=None, workers=FETCH_WORKERS,
+                 page_size=PAGE_SIZE, max_pages=MAX_PAGES, timeout=TIMEOUT):
+        self.base_url = base_url.rstrip('/')
+        self.workers = max(1, workers)
+        self.session = session or build_session(pool_size=self.workers)
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self.timeout = timeout
+
+    def get_page(self, resource, page):
+        resp = self.session.get(
+            f"{self.base_url}/{resource}?page={page}&pageSize={self.page_size}",
+            timeout=self.timeout,
+        )
+        resp.raise_for_status()
+        return resp
+
+    def fetch_all(self, resource):
+        first = self.get_page(resource, 1)
+        data = first.json()
+        if not data:
+            return []
+
+        pages = {1: data}
+        last = last_page(first)
+
+        def fetch(page):
+            return page, self.get_page(resource, page).json()
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            if last is not None:
+                remaining = range(2, min(last, self.max_pages) + 1)
+                pages.update(pool.map(fetch, remaining))
+            else:
+                # Sem header Link: busca em janelas até achar uma página incompleta
+                page, done = 2, len(data) < self.page_size
+                while not done and page <= self.max_pages:
+                    window = range(page, min(page + self.workers, self.max_pages + 1))
+                    for number, items in pool.map(fetch, window):
+                        if len(items) < self.page_size:
+                            done = True
+                        if items:
+                            pages[number] = items
+                        if done:
+                            break
+                    page = window.stop
+
+        results = []
+        for number in sorted(pages):
+            results.extend(pages[number])
+        return results
@@ -0,0 +1,55 @@
+from books.importer.records import extract_id, extract_ids
+from books.importer.upsert import BATCH_SIZE
+
+
+def build_pairs(items, key, left_ids, right_ids):
+    """
+    Conjunto de pares (pk esquerdo, pk direito) a partir da lista de URLs
+    `key` de cada registro, ignorando referências que não existem no banco.
+    """
+    pairs = set()
+    for item in items:
+        left = left_ids.get(extract_id(item['url']))
+        if left is None:
+            continue
+        for ext in extract_ids(item.get(key)):
+            right = right_ids.get(ext)
+            if right is not None:
+                pairs.add((left, right))
+    return pairs
+
+
+def link(relation, pairs, scope, sync=False, batch_size=BATCH_SIZE):
+    """
+    Sincroniza a tabela intermediária de `relation` (ex.: Character.allegiances)
+    com `pairs`: insere só os pares que faltam e, em modo sync, remove as
+    ligações dos objetos em `scope` (pks do lado esquerdo, pks do lado
+    direito) que não vieram da origem. Retorna (inseridos, removidos).
+    """
+    field = relation.field
+    through = relation.through
+    left = f'{field.m2m_field_name()}_id'
+    right = f'{field.m2m_reverse_field_name()}_id'
+
+    existing = {
+        (lpk, rpk): pk
+        for pk, lpk, rpk in through.objects.values_list('pk', left, right)
+    }
+
+    missing = [
+        through(**{left: lpk, right: rpk})
+        for lpk, rpk in pairs if (lpk, rpk) not in existing
+    ]
+    through.objects.bulk_create(missing, batch_size=batch_size, ignore_conflicts=True)
+
+    removed = 0
+    if sync:
+        left_scope, right_scope = scope
+        stale = [
+            pk for pair, pk in existing.items()
+            if (pair[0] in left_scope or pair[1] in right_scope) and pair not in pairs
+        ]
+        for start in range(0, len(stale), batch_size):
+            removed += through.objects.filter(pk__in=stale[start:start + batch_size]).delete()[0]
+
+    return len(missing), removed
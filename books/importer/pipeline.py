@@ -0,0 +1,216 @@
+import hashlib
+
+from django.db import transaction
+
+from books.importer.linking import build_pairs, link
+from books.importer.profiling import ImportProfiler
+from books.importer.records import (
+    CHARACTER_LINKS, HOUSE_CHARACTER_LINKS, HOUSE_LINKS,
+    book_fields, character_fields, extract_id, house_fields,
+)
+from books.importer.upsert import BATCH_SIZE, bulk_upsert, id_map, resolve_foreign_keys
+from books.models import Book, BookCover
+from books import rendering
+from books.covers import cover_inputs, ensure_variants
+from core import search
+from core.versioning import bump
+from characters.models import Character
+from houses.models import House
+
+# Ordem em que os recursos são gravados; as referências cruzadas só são
+# resolvidas depois que os três estão no banco.
+RESOURCES = ('characters', 'houses', 'books')
+
+LABELS = {'characters': 'personagens', 'houses': 'casas', 'books': 'livros'}
+
+MODELS = {'characters': Character, 'houses': House, 'books': Book}
+
+ROWS = {'characters': character_fields, 'houses': house_fields, 'books': book_fields}
+
+# (campo M2M, recurso do lado esquerdo, recurso do lado direito, fontes)
+# Cada fonte é (recurso, chave do JSON). Livro<->personagem vem dos dois
+# lados da API e vira uma única tabela intermediária.
+M2M_LINKS = (
+    (Character.allegiances, 'characters', 'houses', (('characters', 'allegiances'),)),
+    (House.cadet_branches, 'houses', 'houses', (('houses', 'cadetBranches'),)),
+    (House.sworn_members, 'houses', 'characters', (('houses', 'swornMembers'),)),
+    (Book.characters, 'books', 'characters', (('books', 'characters'), ('characters', 'books'))),
+    (Book.pov_characters, 'books', 'characters', (('books', 'povCharacters'), ('characters', 'povBooks'))),
+)
+
+
+class StagingGraph:
+    """Registros de origem de cada recurso, buscados uma única vez."""
+
+    def __init__(self, records):
+        self.records = records
+
+    @classmethod
+    def load(cls, source, resources=RESOURCES):
+        return cls({name: source.fetch_all(name) for name in RESOURCES if name in resources})
+
+    def __contains__(self, resource):
+        return resource in self.records
+
+    def __getitem__(self, resource):
+        return self.records.get(resource, [])
+
+
+class Importer:
+    """
+    Importa o grafo de uma vez: grava os campos simples dos três recursos,
+    depois resolve as FKs e as ligações M2M com os mapas external_id -> pk,
+    tudo na mesma transação.
+    """
+
+    def __init__(self, graph, covers=None, batch_size=BATCH_SIZE, sync=False,
+                 profiler=None, log=print, variants_dir=None):
+        self.graph = graph
+        self.covers = covers
+        self.variants_dir = variants_dir
+        self.batch_size = batch_size
+        self.sync = sync
+        self.profiler = profiler or ImportProfiler()
+        self.log = log
+        self.ids = {}
+
+    def run(self):
+        with self.profiler.phase('covers'):
+            covers = self.fetch_covers()
+        with transaction.atomic():
+            with self.profiler.phase('upsert') as upsert:
+                upsert['rows'] = self.upsert(covers)
+            with self.profiler.phase('fk') as fk:
+                fk['rows'] = self.resolve_foreign_keys()
+            with self.profiler.phase('m2m') as m2m:
+                m2m['rows'] = self.link() + Character.objects.refresh_pov()
+            if upsert['rows'] or fk['rows'] or m2m['rows']:
+                # bulk_create/bulk_update não disparam signals: invalida os ETags
+                # e regrava o índice de busca aqui
+                bump(*MODELS.values(), BookCover)
+                for model in MODELS.values():
+                    search.refresh(model)
+        if self.variants_dir is not None:
+            with self.profiler.phase('variants') as phase:
+                phase['rows'] = self.render_variants()
+
+    def fetch_covers(self):
+        if 'books' not in self.graph or self.covers is None:
+            return {}
+        covers = self.covers.fetch_many(item.get('isbn') for item in self.graph['books'])
+        self.log(">>> capas: {downloaded} baixadas, {revalidated} revalidadas, "
+                 "{fresh} do cache, {missing} sem capa, {skipped} fora do cache".format(**self.covers.stats))
+        return covers
+
+    def upsert(self, covers):
+        written = 0
+        for resource in RESOURCES:
+            if resource not in self.graph:
+                continue
+            self.log(f">>> importando {LABELS[resource]}...")
+            ids, counts = bulk_upsert(
+                MODELS[resource], [ROWS[resource](item) for item in self.graph[resource]],
+                self.batch_size, self.sync,
+            )
+            self.ids[resource] = ids
+            self.log(f">>> {LABELS[resource]}: {counts['inserted']} inseridos, "
+                     f"{counts['updated']} atualizados, {counts['unchanged']} sem mudança, "
+                     f"{counts['deleted']} removidos")
+            written += counts['inserted'] + counts['updated'] + counts['deleted']
+        if 'books' in self.graph and self.covers is not None:
+            written += self.store_covers(covers)
+        return written
+
+    def store_covers(self, covers):
+        """Grava em BookCover só as capas novas ou alteradas; remove as que sumiram."""
+        current = dict(BookCover.objects.values_list('book_id', 'sha256'))
+        changed, gone = [], []
+        for item in self.graph['books']:
+            pk = self.ids['books'][extract_id(item['url'])]
+            image = covers.get(item.get('isbn'))
+            if image is None:
+                # Falha de rede não apaga a capa que já está no banco
+                if pk in current and self.covers.known_missing(item.get('isbn')):
+                    gone.append(pk)
+                continue
+            digest = hashlib.sha256(image).hexdigest()
+            if current.get(pk) != digest:
+                changed.append(BookCover(book_id=pk, image=image, sha256=digest))
+
+        BookCover.objects.bulk_create(
+            changed,
+            batch_size=self.batch_size,
+            update_conflicts=True,
+            unique_fields=['book'],
+            update_fields=['image', 'sha256'],
+        )
+        if gone:
+            BookCover.objects.filter(book_id__in=gone).delete()
+        return len(changed) + len(gone)
+
+    def render_variants(self):
+        """
+        Gera os tamanhos e formatos de cada capa ainda não renderizada e
+        apaga os renders de chaves que não valem mais.
+        """
+        rendered = failed = 0
+        inputs = cover_inputs(Book.objects.values('pk'))
+        for book_id, (key, title, pov_names) in inputs.items():
+            try:
+                rendered += ensure_variants(self.variants_dir, book_id, key, title, pov_names)
+            except OSError as e:
+                # Imagem inválida não interrompe a importação
+                failed += 1
+                self.log(f">>> capa do livro {book_id} não pôde ser renderizada: {e}")
+        removed = rendering.prune_variants(self.variants_dir, {key for key, _, _ in inputs.values()})
+        self.log(f">>> variantes de capa: {rendered} renderizadas, {failed} com erro, {removed} antigas apagadas")
+        return rendered
+
+    def id_map(self, resource):
+        # Recursos fora desta importação são ligados pelo que já está no banco
+        if resource not in self.ids:
+            self.ids[resource] = id_map(MODELS[resource])
+        return self.ids[resource]
+
+    def resolve_foreign_keys(self):
+        written = 0
+        if 'characters' in self.graph:
+            chars = self.id_map('characters')
+            written += resolve_foreign_keys(
+                Character, self.graph['characters'], CHARACTER_LINKS,
+                chars, chars, self.batch_size,
+            )
+        if 'houses' in self.graph:
+            houses = self.id_map('houses')
+            written += resolve_foreign_keys(
+                House, self.graph['houses'], HOUSE_CHARACTER_LINKS,
+                houses, self.id_map('characters'), self.batch_size,
+            )
+            written += resolve_foreign_keys(
+                House, self.graph['houses'], HOUSE_LINKS,
+                houses, houses, self.batch_size,
+            )
+            # overlord acabou de ser gravado em lote, sem passar pelo save
+            written += House.objects.rebuild_paths(self.batch_size)
+        return written
+
+    def link(self):
+        written = 0
+        for relation, left, right, sources in M2M_LINKS:
+            sources = [(resource, key) for resource, key in sources if resource in self.graph]
+            if not sources:
+                continue
+            pairs, scope = set(), {left: set(), right: set()}
+            for resource, key in sources:
+                items = self.graph[resource]
+                other = right if resource == left else left
+                own_ids = self.id_map(resource)
+                found = build_pairs(items, key, own_ids, self.id_map(other))
+                pairs |= found if resource == left else {(r, l) for l, r in found}
+                scope[resource] |= {own_ids.get(extract_id(item['url'])) for item in items} - {None}
+            added, removed = link(
+                relation, pairs, (scope[left], scope[right] if right != left else set()),
+                self.sync, self.batch_size,
+            )
+            written += added + removed
+        return written
@@ -0,0 +1,80 @@
+import json
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+from django.db import connection
+
+from books.importer.fetch import http_requests
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class ImportProfiler:
+    """
+    Mede cada fase da importação: tempo, queries SQL, linhas gravadas,
+    requisições HTTP e pico de memória alocada (tracemalloc).
+    Desligado, `phase` só repassa o dicionário de contagem.
+    """
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.phases = []
+
+    @contextmanager
+    def phase(self, name):
+        stats = {'phase': name, 'rows': 0}
+        if not self.enabled:
+            yield stats
+            return
+
+        started_tracing = not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        queries = QueryCounter()
+        http_before = http_requests.value
+        start = time.perf_counter()
+        try:
+            with connection.execute_wrapper(queries):
+                yield stats
+        finally:
+            stats['seconds'] = round(time.perf_counter() - start, 4)
+            stats['queries'] = queries.count
+            stats['http_requests'] = http_requests.value - http_before
+            stats['peak_memory_kb'] = tracemalloc.get_traced_memory()[1] // 1024
+            if started_tracing:
+                tracemalloc.stop()
+            self.phases.append(stats)
+
+    def totals(self):
+        return {
+            'phase': 'total',
+            'rows': sum(p['rows'] for p in self.phases),
+            'seconds': round(sum(p['seconds'] for p in self.phases), 4),
+            'queries': sum(p['queries'] for p in self.phases),
+            'http_requests': sum(p['http_requests'] for p in self.phases),
+            'peak_memory_kb': max((p['peak_memory_kb'] for p in self.phases), default=0),
+        }
+
+    def report(self):
+        header = f"{'fase':<12}{'tempo (s)':>11}{'queries':>9}{'linhas':>9}{'http':>7}{'pico (KB)':>11}"
+        lines = [header, '-' * len(header)]
+        for p in self.phases + [self.totals()]:
+            lines.append(
+                f"{p['phase']:<12}{p['seconds']:>11.3f}{p['queries']:>9}"
+                f"{p['rows']:>9}{p['http_requests']:>7}{p['peak_memory_kb']:>11}"
+            )
+        return '\n'.join(lines)
+
+    def write_json(self, path, **meta):
+        data = dict(meta, phases=self.phases, total=self.totals())
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2)
@@ -0,0 +1,70 @@
+import datetime
+
+import pytz
+
+
+def extract_id(url):
+    return int(url.rstrip('/').split('/')[-1])
+
+
+def extract_ids(urls):
+    return [extract_id(url) for url in urls or [] if url]
+
+
+def parse_released(value):
+    if not value:
+        return None
+    naive_dt = datetime.datetime.fromisoformat(value.replace('Z', '+00:00'))
+    return pytz.utc.localize(naive_dt) if naive_dt.tzinfo is None else naive_dt
+
+
+def character_fields(item):
+    return {
+        'external_id': extract_id(item['url']),
+        'name': item.get('name') or None,
+        'gender': item.get('gender') or None,
+        'culture': item.get('culture') or None,
+        'born': item.get('born') or None,
+        'died': item.get('died') or None,
+        'titles': item.get('titles', []),
+        'aliases': item.get('aliases', []),
+        'tv_series': item.get('tvSeries', []),
+        'played_by': item.get('playedBy', []),
+    }
+
+
+def house_fields(item):
+    return {
+        'external_id': extract_id(item['url']),
+        'name': item.get('name'),
+        'region': item.get('region'),
+        'coat_of_arms': item.get('coatOfArms'),
+        'words': item.get('words'),
+        'titles': item.get('titles', []),
+        'seats': item.get('seats', []),
+        'founded': item.get('founded') or None,
+        'died_out': item.get('diedOut') or None,
+        'ancestral_weapons': item.get('ancestralWeapons', []),
+    }
+
+
+def book_fields(item):
+    isbn = item.get('isbn') or ''
+    return {
+        'external_id': extract_id(item['url']),
+        'name': item.get('name'),
+        'isbn': item.get('isbn'),
+        'authors': item.get('authors', []),
+        'number_of_pages': item.get('numberOfPages'),
+        'publisher': item.get('publisher'),
+        'country': item.get('country'),
+        'media_type': item.get('mediaType'),
+        'released': parse_released(item.get('released')),
+        'amazon_link': f"https://www.amazon.com.br/s?k={isbn.replace('-', '')}",
+    }
+
+
+# Campo do modelo -> chave do JSON de origem para as FKs resolvidas após o upsert
+CHARACTER_LINKS = {'father': 'father', 'mother': 'mother', 'spouse': 'spouse'}
+HOUSE_CHARACTER_LINKS = {'current_lord': 'currentLord', 'heir': 'heir', 'founder': 'founder'}
+HOUSE_LINKS = {'overlord': 'overlord'}
@@ -0,0 +1,67 @@
+import gzip
+import json
+
+RESOURCES = ('books', 'characters', 'houses')
+
+
+class SnapshotError(Exception):
+    pass
+
+
+def open_snapshot(path, mode):
+    if str(path).endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+def dump(path, resources):
+    """
+    Grava `resources` ({'books': [...], ...}) como NDJSON, uma linha
+    {"resource": ..., "data": {...}} por registro. Retorna o total gravado.
+    """
+    total = 0
+    with open_snapshot(path, 'w') as f:
+        for resource, items in resources.items():
+            for item in items:
+                f.write(json.dumps({'resource': resource, 'data': item}, ensure_ascii=False))
+                f.write('\n')
+                total += 1
+    return total
+
+
+def iter_records(path):
+    """Lê o snapshot linha a linha, gerando (recurso, registro)."""
+    with open_snapshot(path, 'r') as f:
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+                resource, data = record['resource'], record['data']
+            except (ValueError, KeyError, TypeError) as e:
+                raise SnapshotError(f"{path}:{number}: registro inválido ({e})") from e
+            if resource not in RESOURCES:
+                raise SnapshotError(f"{path}:{number}: recurso desconhecido '{resource}'")
+            yield resource, data
+
+
+class SnapshotSource:
+    """
+    Fonte de registros lida de um snapshot NDJSON, com a mesma interface
+    do PageFetcher. O arquivo é percorrido uma única vez.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.resources = None
+
+    def fetch_all(self, resource):
+        if self.resources is None:
+            resources = {name: [] for name in RESOURCES}
+            try:
+                for name, data in iter_records(self.path):
+                    resources[name].append(data)
+            except OSError as e:
+                raise SnapshotError(f"{self.path}: {e}") from e
+            self.resources = resources
+        return self.resources[resource]
@@ -0,0 +1,89 @@
+import hashlib
+import json
+
+from books.importer.records import extract_id
+
+BATCH_SIZE = 500
+
+
+def id_map(model):
+    """Mapa external_id -> pk de todas as linhas do modelo, em uma consulta."""
+    return dict(model.objects.values_list('external_id', 'pk'))
+
+
+def fingerprint(row):
+    payload = json.dumps(row, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def bulk_upsert(model, rows, batch_size=BATCH_SIZE, sync=False):
+    """
+    Insere ou atualiza `rows` (dicts de campos) com um INSERT ... ON CONFLICT
+    por lote, usando external_id como chave.
+
+    Cada linha recebe o fingerprint do seu conteúdo; em modo `sync` só as
+    linhas novas ou com fingerprint diferente são gravadas e as que sumiram
+    da origem são removidas. Retorna (mapa external_id -> pk, contagens).
+    """
+    current = dict(model.objects.values_list('external_id', 'fingerprint'))
+    counts = {'inserted': 0, 'updated': 0, 'unchanged': 0, 'deleted': 0}
+
+    changed = []
+    for row in rows:
+        row['fingerprint'] = fingerprint(row)
+        if row['external_id'] not in current:
+            counts['inserted'] += 1
+        elif current[row['external_id']] != row['fingerprint']:
+            counts['updated'] += 1
+        else:
+            counts['unchanged'] += 1
+            if sync:
+                continue
+        changed.append(row)
+
+    if changed:
+        update_fields = [name for name in changed[0] if name != 'external_id']
+        model.objects.bulk_create(
+            [model(**row) for row in changed],
+            batch_size=batch_size,
+            update_conflicts=True,
+            unique_fields=['external_id'],
+            update_fields=update_fields,
+        )
+
+    if sync:
+        gone = list(current.keys() - {row['external_id'] for row in rows})
+        for start in range(0, len(gone), batch_size):
+            batch = gone[start:start + batch_size]
+            counts['deleted'] += model.objects.filter(external_id__in=batch).delete()[1].get(model._meta.label, 0)
+
+    return id_map(model), counts
+
+
+def resolve_foreign_keys(model, items, links, own_ids, target_ids, batch_size=BATCH_SIZE):
+    """
+    Preenche as FKs `links` (campo -> chave do JSON) a partir dos mapas
+    external_id -> pk já carregados. Só as linhas cujo valor atual difere
+    do esperado são gravadas, com bulk_update. Retorna quantas mudaram.
+    """
+    attnames = [f'{field}_id' for field in links]
+    current = {
+        pk: values
+        for pk, *values in model.objects.values_list('pk', *attnames)
+    }
+
+    objs = []
+    for item in items:
+        pk = own_ids.get(extract_id(item['url']))
+        if pk is None:
+            continue
+        values = []
+        for key in links.values():
+            url = item.get(key)
+            values.append(target_ids.get(extract_id(url)) if url else None)
+        if current.get(pk) != values:
+            objs.append(model(pk=pk, **dict(zip(attnames, values))))
+
+    if objs:
+        model.objects.bulk_update(objs, list(links), batch_size=batch_size)
+    return len(objs)
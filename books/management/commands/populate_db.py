@@ -1,16 +1,18 @@
-import os
-from books.models import Book
-from characters.models import Character
-from houses.models import House
-import requests
-import base64
-from django.core.management.base import BaseCommand
-from django.utils import timezone
-import datetime
-import pytz
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from books.importer.covers import COVER_URL, COVER_WORKERS, CoverCache
+from books.importer.fetch import FETCH_WORKERS, API_BASE, PageFetcher
+from books.importer.pipeline import RESOURCES, Importer, StagingGraph
+from books.importer.profiling import ImportProfiler
+from books.importer.snapshot import SnapshotError, SnapshotSource, dump
+from books.importer.upsert import BATCH_SIZE
+from houses.hierarchy import HierarchyTooDeep
 
 """
-Rodar 2 vezes para fazer as ligações entre personagens e livros
+Importa livros, personagens e casas em uma única execução: cada recurso é
+buscado uma vez, gravado em lote e só então as referências cruzadas são
+resolvidas, dentro da mesma transação.
 
 LIVROS
 
@@ -95,31 +97,6 @@ CASAS
 }
 """
 
-MAX_PAGES = 10
-API_BASE = "https://anapioficeandfire.com/api"
-COVER_URL = "https://covers.openlibrary.org/b/isbn/{}-L.jpg"
-
-def extract_id(url):
-    return int(url.rstrip('/').split('/')[-1])
-
-def fetch_all(resource):
-    results, page = [], 1
-    for page in range(1, MAX_PAGES + 1):
-        resp = requests.get(f"{API_BASE}/{resource}?page={page}&pageSize=50")
-        resp.raise_for_status()
-        data = resp.json()
-        if not data:
-            break
-        results.extend(data)
-    return results
-
-def download_cover_base64(isbn):
-    url = COVER_URL.format(isbn.replace('-', ''))
-    resp = requests.get(url)
-    if resp.status_code == 200:
-        return base64.b64encode(resp.content).decode('ascii')
-    return None
-
 
 class Command(BaseCommand):
 
@@ -129,176 +106,100 @@ class Command(BaseCommand):
             choices=['all', 'books', 'characters', 'houses'],
             default='all',
         )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=FETCH_WORKERS,
+            help='Máximo de páginas buscadas em paralelo',
+        )
+        parser.add_argument(
+            '--api-base',
+            default=API_BASE,
+            help='URL base da API de origem',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BATCH_SIZE,
+            help='Quantidade de linhas por INSERT/UPDATE em lote',
+        )
+        parser.add_argument(
+            '--sync',
+            action='store_true',
+            help='Grava só os registros alterados e remove o que sumiu da origem',
+        )
+        parser.add_argument(
+            '--from-file',
+            metavar='SNAPSHOT',
+            help='Importa de um snapshot NDJSON em vez da API (capas só do cache local)',
+        )
+        parser.add_argument(
+            '--dump',
+            metavar='SNAPSHOT',
+            help='Grava os registros obtidos em um snapshot NDJSON',
+        )
+        parser.add_argument(
+            '--cover-url',
+            default=COVER_URL,
+            help='Modelo da URL das capas, com {} no lugar do ISBN',
+        )
+        parser.add_argument(
+            '--refresh-covers',
+            action='store_true',
+            help='Revalida todas as capas do cache, mesmo as recentes',
+        )
+        parser.add_argument(
+            '--profile',
+            action='store_true',
+            help='Mostra tempo, queries, linhas, HTTP e memória de cada fase',
+        )
+        parser.add_argument(
+            '--profile-json',
+            metavar='PATH',
+            help='Grava o relatório de --profile em JSON (implica --profile)',
+        )
 
     def handle(self, *args, **options):
         tipo = options['type']
-        
-        if tipo == 'all' or tipo == 'characters':
-            self.import_characters()
-            
-        if tipo == 'all' or tipo == 'houses':
-            self.import_houses()
-            self.relate_characters_to_houses()
-            
-        if tipo == 'all' or tipo == 'books':
-            self.import_books()
-            if tipo == 'books':
-                self.get_characters()
-            self.relate_characters_to_books()
-            
-        print(f">>> importação de {tipo} concluída!")
-
-    def import_characters(self):
-        print(">>> importando personagens...")
-        self.get_characters()
-        
-        for item in self.chars_json:
-            cid = extract_id(item['url'])
-            Character.objects.update_or_create(
-                external_id=cid,
-                defaults={
-                    'name': item.get('name') or None,
-                    'gender': item.get('gender') or None,
-                    'culture': item.get('culture') or None,
-                    'born': item.get('born') or None,
-                    'died': item.get('died') or None,
-                    'titles': item.get('titles', []),
-                    'aliases': item.get('aliases', []),
-                    'tv_series': item.get('tvSeries', []),
-                    'played_by': item.get('playedBy', []),
-                }
-            )
-            
-        for item in self.chars_json:
-            char = Character.objects.get(external_id=extract_id(item['url']))
-            for i in ['father', 'mother', 'spouse']:
-                url = item.get(i)
-                if url:
-                    related = Character.objects.filter(external_id=extract_id(url)).first()
-                    if related:
-                        setattr(char, i, related)
-            char.save()
-            
-    def relate_characters_to_houses(self):
-        for item in self.chars_json:
-            char = Character.objects.get(external_id=extract_id(item['url']))
-            for i in item.get('allegiances', []):
-                house = House.objects.filter(external_id=extract_id(i)).first()
-                if house:
-                    char.allegiances.add(house)
-                
-                
-    def relate_characters_to_books(self):
-        for item in self.chars_json:
-            char = Character.objects.get(external_id=extract_id(item['url']))
-            for i in item.get('books', []):
-                book = Book.objects.filter(external_id=extract_id(i)).first()
-                if book:
-                    char.books.add(book)
-                    
-            for i in item.get('povBooks', []):
-                book = Book.objects.filter(external_id=extract_id(i)).first()
-                if book:
-                    char.pov_books.add(book)
-                
-
-    def import_houses(self):
-        print(">>> importando casas...")
-        self.get_houses()
-        
-        for item in self.houses_json:
-            hid = extract_id(item['url'])
-            House.objects.update_or_create(
-                external_id=hid,
-                defaults={
-                    'name': item.get('name'),
-                    'region': item.get('region'),
-                    'coat_of_arms': item.get('coatOfArms'),
-                    'words': item.get('words'),
-                    'titles': item.get('titles', []),
-                    'seats': item.get('seats', []),
-                    'founded': item.get('founded') or None,
-                    'died_out': item.get('diedOut') or None,
-                    'ancestral_weapons': item.get('ancestralWeapons', []),
-                }
-            )
-            
-        for item in self.houses_json:
-            house = House.objects.get(external_id=extract_id(item['url']))
-            for rel in ['currentLord', 'heir', 'founder', 'overlord']:
-                url = item.get(rel)
-                if url:
-                    if rel == 'overlord':
-                        related = House.objects.filter(external_id=extract_id(url)).first()
-                    else:
-                        related = Character.objects.filter(external_id=extract_id(url)).first()
-                    
-                    if related:
-                        setattr(house, rel.lower() if rel != 'overlord' else 'overlord', related)
-            house.save()
-            for cb in item.get('cadetBranches', []):
-                branch = House.objects.filter(external_id=extract_id(cb)).first()
-                if branch:
-                    house.cadet_branches.add(branch)
-            for sm in item.get('swornMembers', []):
-                member = Character.objects.filter(external_id=extract_id(sm)).first()
-                if member:
-                    house.sworn_members.add(member)
-
-
-    def get_houses(self):
-        self.houses_json = fetch_all('houses')
-        return self.houses_json
-    
-    
-    def get_characters(self):
-        self.chars_json = fetch_all('characters')
-        return self.chars_json
-    
-    
-    def get_books(self):
-        self.books_json = fetch_all('books')
-        return self.books_json
-    
-        
-    def import_books(self):
-        print(">>> importando livros...")
-        self.get_books()
-
-        for item in self.books_json:
-            bid = extract_id(item['url'])
-            cover = download_cover_base64(item.get('isbn', '')) if item.get('isbn') else None
-            released_str = item.get('released')
-            released = None
-            
-            if released_str:
-                naive_dt = datetime.datetime.fromisoformat(released_str.replace('Z', '+00:00'))
-                released = pytz.utc.localize(naive_dt) if naive_dt.tzinfo is None else naive_dt
-            
-            book, _ = Book.objects.update_or_create(
-                external_id=bid,
-                defaults={
-                    'name': item.get('name'),
-                    'isbn': item.get('isbn'),
-                    'authors': item.get('authors', []),
-                    'number_of_pages': item.get('numberOfPages'),
-                    'publisher': item.get('publisher'),
-                    'country': item.get('country'),
-                    'media_type': item.get('mediaType'),
-                    'released': released,
-                    'cover_base64': cover,
-                    'amazon_link': f"https://www.amazon.com.br/s?k={item.get('isbn').replace('-', '')}",
-                }
-            )
-            for url in item.get('characters', []):
-                character = Character.objects.filter(external_id=extract_id(url)).first()
-                if character:   
-                    book.characters.add(character)
-            for url in item.get('povCharacters', []):
-                character = Character.objects.filter(external_id=extract_id(url)).first()
-                if character:
-                    book.pov_characters.add(character)
-    
-
+        if options['from_file']:
+            source = SnapshotSource(options['from_file'])
+        else:
+            source = PageFetcher(options['api_base'], workers=options['workers'])
+        # Do snapshot, as capas vêm só do cache em disco: nada de rede
+        covers = CoverCache(
+            settings.COVER_CACHE_DIR,
+            url=options['cover_url'],
+            workers=COVER_WORKERS,
+            max_age=0 if options['refresh_covers'] else settings.COVER_CACHE_MAX_AGE,
+            offline=bool(options['from_file']),
+        )
 
+        profiler = ImportProfiler(enabled=options['profile'] or bool(options['profile_json']))
+
+        try:
+            with profiler.phase('fetch'):
+                graph = StagingGraph.load(source, RESOURCES if tipo == 'all' else (tipo,))
+        except SnapshotError as e:
+            raise CommandError(f"snapshot inválido: {e}") from e
+
+        try:
+            Importer(
+                graph, covers,
+                batch_size=options['batch_size'],
+                sync=options['sync'],
+                profiler=profiler,
+                variants_dir=settings.COVER_VARIANTS_DIR,
+            ).run()
+        except HierarchyTooDeep as e:
+            raise CommandError(str(e)) from e
+
+        if options['dump']:
+            total = dump(options['dump'], graph.records)
+            print(f">>> snapshot com {total} registros gravado em {options['dump']}")
+
+        if profiler.enabled:
+            print(profiler.report())
+        if options['profile_json']:
+            profiler.write_json(options['profile_json'], type=tipo, sync=options['sync'])
 
+        print(f">>> importação de {tipo} concluída!")
@@ -0,0 +1,24 @@
+# Generated by Django 5.0.4 on 2026-10-18 08:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0005_book_fingerprint'),
+        ('characters', '0005_merge_book_links'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='book',
+            name='characters',
+            field=models.ManyToManyField(blank=True, related_name='books', to='characters.character'),
+        ),
+        migrations.AlterField(
+            model_name='book',
+            name='pov_characters',
+            field=models.ManyToManyField(blank=True, related_name='pov_books', to='characters.character'),
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 5.0.4 on 2026-10-18 08:34
+
+import base64
+import binascii
+import hashlib
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+BATCH_SIZE = 50
+
+
+def move_covers(apps, schema_editor):
+    Book = apps.get_model('books', 'Book')
+    BookCover = apps.get_model('books', 'BookCover')
+    covers = (
+        Book.objects.exclude(cover_base64__isnull=True).exclude(cover_base64='')
+        .values_list('pk', 'cover_base64').iterator(chunk_size=BATCH_SIZE)
+    )
+    batch = []
+    for pk, data in covers:
+        try:
+            image = base64.b64decode(data, validate=True)
+        except (binascii.Error, ValueError):
+            continue
+        batch.append(BookCover(book_id=pk, image=image, sha256=hashlib.sha256(image).hexdigest()))
+        if len(batch) >= BATCH_SIZE:
+            BookCover.objects.bulk_create(batch)
+            batch = []
+    BookCover.objects.bulk_create(batch)
+
+
+def restore_covers(apps, schema_editor):
+    Book = apps.get_model('books', 'Book')
+    BookCover = apps.get_model('books', 'BookCover')
+    for cover in BookCover.objects.iterator(chunk_size=BATCH_SIZE):
+        Book.objects.filter(pk=cover.book_id).update(
+            cover_base64=base64.b64encode(bytes(cover.image)).decode('ascii')
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0006_alter_book_characters_alter_book_pov_characters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookCover',
+            fields=[
+                ('book', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='cover', serialize=False, to='books.book')),
+                ('image', models.BinaryField()),
+                ('sha256', models.CharField(max_length=64)),
+            ],
+        ),
+        migrations.RunPython(move_covers, restore_covers),
+        migrations.RemoveField(
+            model_name='book',
+            name='cover_base64',
+        ),
+    ]
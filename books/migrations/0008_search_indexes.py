@@ -0,0 +1,29 @@
+# Generated by Django 5.0.4 on 2026-10-18 08:52
+
+from django.db import migrations, models
+
+from core.search import CreateSearchIndex
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0007_move_cover_to_bookcover'),
+        ('characters', '0006_character_is_pov'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['publisher'], name='book_publisher_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['media_type'], name='book_media_type_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['released'], name='book_released_idx'),
+        ),
+        CreateSearchIndex('books_book', ['name', 'publisher', 'authors']),
+    ]
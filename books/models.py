@@ -24,6 +24,7 @@ from django.db import models
 
 class Book(models.Model):
     external_id = models.IntegerField(unique=True)
+    fingerprint = models.CharField(max_length=64, blank=True, null=True, editable=False)
     name = models.CharField(max_length=255)
     isbn = models.CharField(max_length=20)
     authors = models.JSONField(default=list)
@@ -34,20 +35,40 @@ class Book(models.Model):
     released = models.DateTimeField()
     amazon_link = models.TextField(default=None, blank=True, null=True)
 
-    cover_base64 = models.TextField(blank=True, null=True)
     characters = models.ManyToManyField(
         'characters.Character',
-        related_name='character_books',
+        related_name='books',
         blank=True
     )
     pov_characters = models.ManyToManyField(
         'characters.Character',
-        related_name='character_pov_books',
+        related_name='pov_books',
         blank=True
     )
 
+    # Colunas do ?search= (core.search); as mesmas da migration que cria o índice
+    search_fields = ('name', 'publisher', 'authors')
+
     class Meta:
         ordering = ['id']
+        indexes = [
+            models.Index(fields=['publisher'], name='book_publisher_idx'),
+            models.Index(fields=['media_type'], name='book_media_type_idx'),
+            models.Index(fields=['released'], name='book_released_idx'),
+        ]
 
     def __str__(self):
         return self.name
+
+
+class BookCover(models.Model):
+    """Imagem da capa, fora da linha do livro para não pesar nas listagens."""
+    book = models.OneToOneField(
+        Book, on_delete=models.CASCADE,
+        primary_key=True, related_name='cover'
+    )
+    image = models.BinaryField()
+    sha256 = models.CharField(max_length=64)
+
+    def __str__(self):
+        return f"Capa de {self.book_id}"
@@ -0,0 +1,121 @@
+# Desenho das capas. Não depende do Django, para rodar nos processos do
+# pool de renderização (books.covers).
+import hashlib
+import shutil
+from functools import lru_cache
+from io import BytesIO
+from pathlib import Path
+
+from PIL import Image, ImageDraw, ImageFont
+
+from books.importer.covers import write_atomic
+
+# Muda quando o desenho da capa mudar, para não servir renders antigos
+RENDER_VERSION = 1
+
+TITLE_POSITION = (10, 50)
+POV_CHARS_POSITION = (30, 100)
+
+# Largura máxima de cada tamanho; full mantém a original
+SIZES = {'thumb': 160, 'medium': 480, 'full': None}
+
+# Formato do arquivo -> (formato do Pillow, content type)
+FORMATS = {'webp': ('WEBP', 'image/webp'), 'jpeg': ('JPEG', 'image/jpeg')}
+
+
+@lru_cache(maxsize=None)
+def load_font(size):
+    """Fonte carregada uma vez por processo; sem arial, usa a padrão do Pillow."""
+    try:
+        return ImageFont.truetype("arial.ttf", size)
+    except OSError:
+        return ImageFont.load_default()
+
+
+def render_key(image_sha256, title, pov_names):
+    """Hash das entradas do render: a capa gerada só depende delas."""
+    raw = '\0'.join([str(RENDER_VERSION), image_sha256, title or '', *pov_names])
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def draw_cover(image_data, title, pov_names):
+    """Desenha o título e os personagens POV sobre a capa."""
+    image = Image.open(BytesIO(image_data))
+    title = title or ''
+    pov_chars = "".join(name + "\n" for name in pov_names)
+
+    # Criar uma nova camada para o fundo semi transparente
+    overlay = Image.new('RGBA', image.size, (0, 0, 0, 0))
+    draw = ImageDraw.Draw(overlay)
+    title_font = load_font(30)
+    chars_font = load_font(20)
+
+    # Calcular o tamanho do texto para criar o retângulo de fundo
+    title_bbox = draw.textbbox(TITLE_POSITION, title, font=title_font)
+    pov_chars_bbox = draw.textbbox(POV_CHARS_POSITION, pov_chars, font=chars_font)
+
+    draw.rounded_rectangle([title_bbox[0]-5, title_bbox[1]-5, title_bbox[2]+5, title_bbox[3]+5],
+                radius=10,
+                fill=(0, 0, 0, 64))
+    draw.rounded_rectangle([pov_chars_bbox[0]-5, pov_chars_bbox[1]-5, pov_chars_bbox[2]+5, pov_chars_bbox[3]+5],
+                radius=10,
+                fill=(0, 0, 0, 64))
+
+    draw.text(TITLE_POSITION, title, font=title_font, fill=(255, 255, 255, 170))
+    draw.text(POV_CHARS_POSITION, pov_chars, font=chars_font, fill=(255, 255, 255, 170))
+
+    # Combinar a imagem original com a camada de overlay
+    image = Image.alpha_composite(image.convert('RGBA'), overlay)
+    return image.convert('RGB')
+
+
+def encode(image, size, fmt):
+    width = SIZES[size]
+    if width and image.width > width:
+        image = image.resize((width, round(image.height * width / image.width)), Image.LANCZOS)
+    buffer = BytesIO()
+    image.save(buffer, format=FORMATS[fmt][0])
+    return buffer.getvalue()
+
+
+def variant_path(root, key, size, fmt):
+    return Path(root) / key[:2] / key / f'{size}.{fmt}'
+
+
+def missing_variants(root, key):
+    return [
+        (size, fmt) for size in SIZES for fmt in FORMATS
+        if not variant_path(root, key, size, fmt).exists()
+    ]
+
+
+def write_variants(root, key, image_data, title, pov_names, variants):
+    """Desenha a capa uma vez e grava cada (tamanho, formato) de `variants`."""
+    image = draw_cover(image_data, title, pov_names)
+    for size, fmt in variants:
+        path = variant_path(root, key, size, fmt)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        write_atomic(path, encode(image, size, fmt))
+
+
+def prune_variants(root, keep):
+    """
+    Apaga os diretórios de render cuja chave não está em `keep` (capa,
+    título ou POVs mudaram, ou o livro sumiu). Retorna quantos apagou.
+    """
+    removed = 0
+    root = Path(root)
+    if not root.is_dir():
+        return removed
+    for shard in root.iterdir():
+        # Só mexe no que tem a forma <xx>/<sha256>, criada por write_variants
+        if not shard.is_dir() or len(shard.name) != 2:
+            continue
+        for directory in shard.iterdir():
+            if directory.is_dir() and len(directory.name) == 64 and directory.name.startswith(shard.name) \
+                    and directory.name not in keep:
+                shutil.rmtree(directory, ignore_errors=True)
+                removed += 1
+        if not any(shard.iterdir()):
+            shard.rmdir()
+    return removed
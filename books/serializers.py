@@ -1,22 +1,29 @@
 from rest_framework import serializers
+from core.fields import CachedHyperlinkedIdentityField, CachedHyperlinkedRelatedField
+from core.serializers import DynamicFieldsMixin, EagerLoadingMixin
 from books.models import Book
 from characters.models import Character
 
-class BookSerializer(serializers.HyperlinkedModelSerializer):
-    url = serializers.HyperlinkedIdentityField(
+class BookSerializer(DynamicFieldsMixin, EagerLoadingMixin, serializers.HyperlinkedModelSerializer):
+    expandable_fields = {
+        'characters': 'characters.serializers.CharacterSerializer',
+        'pov_characters': 'characters.serializers.CharacterSerializer',
+    }
+
+    url = CachedHyperlinkedIdentityField(
         view_name='book-detail',
         lookup_field='pk'
     )
-    cover_url = serializers.HyperlinkedIdentityField(
+    cover_url = CachedHyperlinkedIdentityField(
         view_name='book-cover',
         lookup_field='pk'
     )
-    characters = serializers.HyperlinkedRelatedField(
+    characters = CachedHyperlinkedRelatedField(
         many=True,
         view_name='character-detail',
         read_only=True
     )
-    pov_characters = serializers.HyperlinkedRelatedField(
+    pov_characters = CachedHyperlinkedRelatedField(
         many=True,
         view_name='character-detail',
         read_only=True
@@ -27,6 +34,6 @@ class BookSerializer(serializers.HyperlinkedModelSerializer):
         fields = [
             'url', 'amazon_link', 'external_id', 'name', 'isbn', 'authors',
             'number_of_pages', 'publisher', 'country', 'media_type',
-            'released', 'cover_base64', 'cover_url', 'characters',
+            'released', 'cover_url', 'characters',
             'pov_characters'
         ]
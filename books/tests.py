@@ -1,8 +1,44 @@
-from django.test import TestCase
+import copy
+import glob
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import warnings
+from contextlib import redirect_stdout
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO, StringIO
+from pathlib import Path
+from unittest.mock import patch
+from urllib.parse import parse_qs, urlparse
+
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from PIL import Image
 from rest_framework.test import APIClient
-from books.models import Book
+from books import covers
+from books.models import Book, BookCover
 from characters.models import Character
+from core.models import ResourceVersion
+from core.pool import BoundedProcessPool, Saturated, TimedOut
+from houses.models import House
+from books.importer.covers import CoverCache
+from books.importer.fetch import PageFetcher, build_session
+from books.importer.records import extract_id
+
+
+def make_jpeg(size=(60, 90)):
+    buffer = BytesIO()
+    Image.new('RGB', size, (120, 30, 30)).save(buffer, format='JPEG')
+    return buffer.getvalue()
+
 
 class BookViewSetTest(TestCase):
     def setUp(self):
@@ -17,8 +53,14 @@ class BookViewSetTest(TestCase):
             country="Test Country",
             media_type="Hardcover",
             released="2024-01-01T00:00:00Z",
-            cover_base64="base64string"
         )
+        variants_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, variants_dir)
+        settings = override_settings(COVER_VARIANTS_DIR=Path(variants_dir))
+        settings.enable()
+        self.addCleanup(settings.disable)
+        image = make_jpeg()
+        BookCover.objects.create(book=self.book, image=image, sha256=hashlib.sha256(image).hexdigest())
         self.character = Character.objects.create(
             external_id=1,
             name="Test Character",
@@ -49,7 +91,27 @@ class BookViewSetTest(TestCase):
         url = reverse('book-all-pov-characters')
         response = self.client.get(url)
         self.assertEqual(response.status_code, 200)
-        self.assertEqual(len(response.data), 1)
+        self.assertEqual(response.data['count'], 1)
+
+    def test_all_pov_characters_is_paginated_and_distinct(self):
+        other = Book.objects.create(
+            external_id=2, name="Other Book", isbn="2", authors=["A"], number_of_pages=1, publisher="P",
+            country="C", media_type="Hardcover", released="2024-01-01T00:00:00Z",
+        )
+        other.pov_characters.add(self.character)
+        for i in range(2, 14):
+            other.pov_characters.add(Character.objects.create(external_id=i, name=f"Character {i}"))
+        url = reverse('book-all-pov-characters')
+        # versões (ETag), count, página e um prefetch para allegiances, books e pov_books
+        with self.assertNumQueries(6):
+            response = self.client.get(url)
+        self.assertEqual(response.data['count'], 13)
+        self.assertEqual(len(response.data['results']), 10)
+
+        other.pov_characters.remove(self.character)
+        self.assertEqual(self.client.get(url).data['count'], 13)
+        self.book.delete()
+        self.assertEqual(self.client.get(url).data['count'], 12)
 
     def test_pov_characters(self):
         url = reverse('book-pov-characters', args=[self.book.id])
@@ -61,3 +123,479 @@ class BookViewSetTest(TestCase):
         url = reverse('book-cover', args=[self.book.id])
         response = self.client.get(url)
         self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+
+    def test_cover_is_rendered_once(self):
+        url = reverse('book-cover', args=[self.book.id])
+        with patch.object(covers.render_pool, 'run', wraps=covers.render_pool.run) as render:
+            first = self.client.get(url)
+            second = self.client.get(url)
+        self.assertEqual(render.call_count, 1)
+        self.assertEqual(first.getvalue(), second.getvalue())
+        self.assertEqual(first['ETag'], second['ETag'])
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+        # O ETag muda com as entradas do render
+        self.book.pov_characters.add(Character.objects.create(external_id=2, name="Another POV"))
+        self.assertNotEqual(self.client.get(url)['ETag'], first['ETag'])
+
+    def test_cover_sizes_and_formats(self):
+        self.book.cover.image = make_jpeg((600, 900))
+        self.book.cover.save()
+        url = reverse('book-cover', args=[self.book.id])
+        full = self.client.get(url)
+        thumb = self.client.get(url, {'size': 'thumb'})
+        self.assertEqual(Image.open(BytesIO(b''.join(full.streaming_content))).size, (600, 900))
+        thumb_content = thumb.getvalue()
+        self.assertEqual(Image.open(BytesIO(thumb_content)).size, (160, 240))
+        self.assertEqual(int(thumb['Content-Length']), len(thumb_content))
+
+        webp = self.client.get(url, {'size': 'medium'}, HTTP_ACCEPT='image/webp,*/*')
+        self.assertEqual(webp['Content-Type'], 'image/webp')
+        self.assertEqual(self.client.get(url, HTTP_ACCEPT='*/*')['Content-Type'], 'image/jpeg')
+        self.assertEqual(self.client.get(url, {'size': 'huge'}).status_code, 400)
+
+    def test_cover_range(self):
+        url = reverse('book-cover', args=[self.book.id])
+        content = b''.join(self.client.get(url).streaming_content)
+        response = self.client.get(url, HTTP_RANGE='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes 10-19/{len(content)}')
+        self.assertEqual(b''.join(response.streaming_content), content[10:20])
+        self.assertEqual(b''.join(self.client.get(url, HTTP_RANGE='bytes=-5').streaming_content), content[-5:])
+        self.assertEqual(self.client.get(url, HTTP_RANGE=f'bytes={len(content)}-').status_code, 416)
+
+    def test_cover_returns_503_when_render_pool_is_saturated(self):
+        url = reverse('book-cover', args=[self.book.id])
+        busy = BoundedProcessPool(workers=1, queue_size=0, max_wait=0)
+        busy.slots.acquire()
+        with patch.object(covers, 'render_pool', busy), override_settings(COVER_RENDER_RETRY_AFTER=7):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '7')
+        self.assertEqual(busy.stats()['rejected'], 1)
+
+        self.assertEqual(self.client.get(url).status_code, 200)
+        stats = self.client.get('/api/metrics/').data['cover_render']
+        self.assertEqual(stats['queue_depth'], 0)
+        self.assertGreaterEqual(stats['completed'], 1)
+        self.assertGreater(stats['latency_max_ms'], 0)
+
+    def test_cover_render_timeout_frees_the_slot(self):
+        url = reverse('book-cover', args=[self.book.id])
+        slow = BoundedProcessPool(workers=1, queue_size=0, max_wait=0, timeout=0.01)
+        with self.assertRaises(TimedOut):
+            slow.run(time.sleep, 1)
+        self.assertEqual(slow.stats()['timed_out'], 1)
+        # O worker ainda está na tarefa: a vaga continua presa até ele terminar
+        self.assertEqual(slow.stats()['queue_depth'], 1)
+        with self.assertRaises(Saturated):
+            slow.run(time.sleep, 0)
+        self.assertTrue(slow.slots.acquire(timeout=30))
+        slow.slots.release()
+        self.assertEqual(slow.stats()['queue_depth'], 0)
+
+        with patch.object(covers.render_pool, 'run', side_effect=TimedOut), \
+                override_settings(COVER_RENDER_RETRY_AFTER=7):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '7')
+
+    def test_cover_missing(self):
+        self.book.cover.delete()
+        url = reverse('book-cover', args=[self.book.id])
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 404)
+
+    def test_list_query_count_is_flat(self):
+        url = reverse('book-list')
+        # versões (ETag), count, página e um prefetch para characters e pov_characters
+        with self.assertNumQueries(5):
+            self.client.get(url)
+        for i in range(2, 11):
+            book = Book.objects.create(
+                external_id=i, name=f"Book {i}", isbn="1", number_of_pages=1, publisher="P",
+                country="C", media_type="Hardcover", released="2024-01-01T00:00:00Z",
+            )
+            book.characters.add(self.character)
+            book.pov_characters.add(self.character)
+        with self.assertNumQueries(5):
+            response = self.client.get(url)
+        self.assertEqual(len(response.data['results']), 10)
+
+    def test_characters_action_query_count_is_flat(self):
+        url = reverse('book-characters', args=[self.book.id])
+        for i in range(2, 6):
+            self.book.characters.add(Character.objects.create(external_id=i, name=f"Character {i}"))
+        # versões (ETag), livro, personagens e um prefetch para allegiances, books e pov_books
+        with self.assertNumQueries(6):
+            response = self.client.get(url)
+        self.assertEqual(len(response.data), 4)
+
+    def test_filters(self):
+        url = reverse('book-list')
+        self.assertEqual(self.client.get(url, {'released_after': '2023-12-31'}).data['count'], 1)
+        self.assertEqual(self.client.get(url, {'released_before': '2023-12-31'}).data['count'], 0)
+        self.assertEqual(self.client.get(url, {'publisher': 'Test Publisher', 'media_type': 'Hardcover'}).data['count'], 1)
+        self.assertEqual(self.client.get(url, {'released_after': 'ontem'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'released_after': '2023-13-01'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'released_before': '2099-01-01T12:00:00Z'}).data['count'], 1)
+
+    def test_date_filters_use_aware_datetimes(self):
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', RuntimeWarning)
+            response = self.client.get(reverse('book-list'), {'released_after': '2019-01-01'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_list_does_not_load_cover(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('book-list'))
+        self.assertFalse(any('books_bookcover' in q['sql'] for q in queries.captured_queries))
+        self.assertNotIn('cover_base64', self.client.get(reverse('book-detail', args=[self.book.id])).data)
+
+
+API = 'https://anapioficeandfire.com/api'
+
+RECORDED_API = {
+    'characters': [
+        {'url': f'{API}/characters/1', 'name': 'Eddard Stark', 'gender': 'Male', 'spouse': f'{API}/characters/2',
+         'allegiances': [f'{API}/houses/1'], 'books': [f'{API}/books/1'], 'povBooks': [f'{API}/books/1']},
+        {'url': f'{API}/characters/2', 'name': 'Catelyn Stark', 'gender': 'Female', 'spouse': f'{API}/characters/1',
+         'allegiances': [f'{API}/houses/1', f'{API}/houses/2'], 'books': [f'{API}/books/1'], 'povBooks': []},
+        {'url': f'{API}/characters/3', 'name': 'Robb Stark', 'father': f'{API}/characters/1',
+         'mother': f'{API}/characters/2', 'allegiances': [f'{API}/houses/1'], 'books': [], 'povBooks': []},
+        {'url': f'{API}/characters/4', 'name': 'Hodor', 'allegiances': [], 'books': [f'{API}/books/1'], 'povBooks': []},
+        {'url': f'{API}/characters/5', 'name': '', 'culture': 'Braavosi'},
+    ],
+    'houses': [
+        {'url': f'{API}/houses/1', 'name': 'House Stark of Winterfell', 'region': 'The North',
+         'currentLord': f'{API}/characters/3', 'founder': '', 'overlord': '',
+         'cadetBranches': [f'{API}/houses/2'], 'swornMembers': [f'{API}/characters/1', f'{API}/characters/4']},
+        {'url': f'{API}/houses/2', 'name': 'House Karstark', 'region': 'The North',
+         'overlord': f'{API}/houses/1', 'cadetBranches': [], 'swornMembers': []},
+    ],
+    'books': [
+        {'url': f'{API}/books/1', 'name': 'A Game of Thrones', 'isbn': '978-0553103540', 'authors': ['George R. R. Martin'],
+         'numberOfPages': 694, 'publisher': 'Bantam Books', 'country': 'United States', 'mediaType': 'Hardcover',
+         'released': '1996-08-01T00:00:00', 'characters': [f'{API}/characters/2', f'{API}/characters/4'],
+         'povCharacters': [f'{API}/characters/1']},
+    ],
+}
+
+
+class RecordedApiHandler(BaseHTTPRequestHandler):
+    """Substituto local da anapioficeandfire.com servindo registros gravados."""
+    records = {}
+    failures = {}
+    requests_seen = []
+
+    covers = {}
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path.startswith('/covers/'):
+            return self.send_cover(url.path.split('/')[-1].split('.')[0])
+        resource = url.path.rstrip('/').split('/')[-1]
+        query = parse_qs(url.query)
+        page, page_size = int(query['page'][0]), int(query['pageSize'][0])
+        self.requests_seen.append((resource, page))
+        if self.failures.get((resource, page)):
+            self.failures[(resource, page)] -= 1
+            self.send_response(503)
+            self.end_headers()
+            return
+        records = self.records.get(resource, [])
+        body = json.dumps(records[(page - 1) * page_size:page * page_size]).encode()
+        last = max(1, -(-len(records) // page_size))
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Link', f'<{url.path}?page={last}&pageSize={page_size}>; rel="last"')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_cover(self, isbn):
+        self.requests_seen.append(('covers', isbn))
+        content = self.covers.get(isbn)
+        if content is None:
+            self.send_response(404)
+            self.end_headers()
+            return
+        etag = f'"{hashlib.sha256(content).hexdigest()}"'
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'image/jpeg')
+        self.send_header('Content-Length', str(len(content)))
+        self.send_header('ETag', etag)
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, *args):
+        pass
+
+
+class RecordedApiMixin:
+    def start_recorded_api(self, records=RECORDED_API):
+        RecordedApiHandler.records = records
+        RecordedApiHandler.covers = {'9780553103540': b'cover-agot', '9780553108033': b'cover-agot'}
+        RecordedApiHandler.failures = {}
+        RecordedApiHandler.requests_seen = []
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), RecordedApiHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.base_url = f'http://127.0.0.1:{self.server.server_port}/api'
+        self.cover_url = f'http://127.0.0.1:{self.server.server_port}/covers/{{}}.jpg'
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_dir)
+
+    def cover_requests(self):
+        return [seen for seen in RecordedApiHandler.requests_seen if seen[0] == 'covers']
+
+
+class PageFetcherTest(RecordedApiMixin, TestCase):
+    def setUp(self):
+        self.start_recorded_api()
+
+    def fetcher(self):
+        return PageFetcher(self.base_url, session=build_session(backoff=0), workers=3, page_size=2)
+
+    def test_fetch_all_stops_at_last_page(self):
+        results = self.fetcher().fetch_all('characters')
+        self.assertEqual([extract_id(i['url']) for i in results], [1, 2, 3, 4, 5])
+        self.assertEqual(sorted(RecordedApiHandler.requests_seen), [('characters', p) for p in (1, 2, 3)])
+
+    def test_fetch_all_retries_failed_page(self):
+        RecordedApiHandler.failures = {('characters', 2): 1}
+        results = self.fetcher().fetch_all('characters')
+        self.assertEqual(len(results), 5)
+        self.assertEqual(RecordedApiHandler.requests_seen.count(('characters', 2)), 2)
+
+
+class CoverCacheTest(RecordedApiMixin, TestCase):
+    def setUp(self):
+        self.start_recorded_api()
+
+    def test_identical_covers_stored_once(self):
+        cache = CoverCache(self.cache_dir, url=self.cover_url, workers=2)
+        covers = cache.fetch_many(['978-0553103540', '978-0553108033', '000-0000000000'])
+        self.assertEqual(covers['978-0553103540'], b'cover-agot')
+        self.assertIsNone(covers['000-0000000000'])
+        self.assertEqual(len(os.listdir(os.path.join(self.cache_dir, 'blobs'))), 1)
+
+    def test_revalidates_with_etag(self):
+        CoverCache(self.cache_dir, url=self.cover_url).fetch_many(['978-0553103540'])
+        cache = CoverCache(self.cache_dir, url=self.cover_url)
+        self.assertEqual(cache.fetch_many(['978-0553103540'])['978-0553103540'], b'cover-agot')
+        self.assertEqual(cache.stats['downloaded'], 0)
+        self.assertEqual(cache.stats['revalidated'], 1)
+
+    def test_offline_uses_disk_only(self):
+        CoverCache(self.cache_dir, url=self.cover_url).fetch_many(['978-0553103540'])
+        RecordedApiHandler.requests_seen = []
+        cache = CoverCache(self.cache_dir, url=self.cover_url, offline=True)
+        covers = cache.fetch_many(['978-0553103540', '978-0553108033'])
+        self.assertEqual(covers, {'978-0553103540': b'cover-agot', '978-0553108033': None})
+        self.assertEqual((cache.stats['fresh'], cache.stats['skipped']), (1, 1))
+        self.assertEqual(self.cover_requests(), [])
+
+
+class PopulateDbTest(RecordedApiMixin, TestCase):
+    def setUp(self):
+        self.start_recorded_api()
+
+    def populate(self, **options):
+        variants_dir = os.path.join(self.cache_dir, 'variants')
+        with override_settings(COVER_CACHE_DIR=self.cache_dir, COVER_VARIANTS_DIR=variants_dir):
+            call_command(
+                'populate_db', api_base=self.base_url, cover_url=self.cover_url,
+                stdout=StringIO(), **options
+            )
+
+    def test_import_all(self):
+        with redirect_stdout(StringIO()):
+            self.populate(batch_size=2)
+        self.assertEqual(Character.objects.count(), 5)
+        robb = Character.objects.get(external_id=3)
+        self.assertEqual(robb.father.name, 'Eddard Stark')
+        self.assertEqual(robb.mother.name, 'Catelyn Stark')
+        stark = House.objects.get(external_id=1)
+        self.assertEqual(stark.current_lord, robb)
+        self.assertEqual(House.objects.get(external_id=2).overlord, stark)
+        self.assertEqual(Book.objects.get().amazon_link, 'https://www.amazon.com.br/s?k=9780553103540')
+        self.assertEqual(set(Character.objects.get(external_id=2).allegiances.values_list('external_id', flat=True)), {1, 2})
+        self.assertEqual(list(stark.cadet_branches.values_list('external_id', flat=True)), [2])
+        self.assertEqual(stark.sworn_members.count(), 2)
+        # Livro<->personagem junta as listas dos dois lados em uma só tabela
+        book = Book.objects.get()
+        self.assertEqual(set(book.characters.values_list('external_id', flat=True)), {1, 2, 4})
+        self.assertEqual(set(Character.objects.filter(books=book).values_list('external_id', flat=True)), {1, 2, 4})
+        self.assertEqual(Character.objects.get(external_id=1).pov_books.get(), book)
+        self.assertEqual(list(Character.objects.filter(is_pov=True).values_list('external_id', flat=True)), [1])
+        # bulk_create não dispara signals: o índice de busca é regravado pela importação
+        self.assertEqual(self.client.get(reverse('character-list'), {'search': 'stark'}).data['count'], 3)
+
+    def test_fetches_each_resource_once(self):
+        with redirect_stdout(StringIO()):
+            self.populate()
+        pages = [seen for seen in RecordedApiHandler.requests_seen if seen[0] != 'covers']
+        self.assertEqual(sorted(pages), [('books', 1), ('characters', 1), ('houses', 1)])
+
+    def test_import_books_links_existing_characters(self):
+        with redirect_stdout(StringIO()):
+            self.populate(type='characters')
+            RecordedApiHandler.requests_seen = []
+            self.populate(type='books')
+        pages = [seen for seen in RecordedApiHandler.requests_seen if seen[0] != 'covers']
+        self.assertEqual(pages, [('books', 1)])
+        self.assertEqual(Book.objects.get().characters.count(), 2)
+
+    def test_reimport_is_idempotent(self):
+        with redirect_stdout(StringIO()):
+            self.populate()
+            self.populate()
+        self.assertEqual(Character.objects.count(), 5)
+        self.assertEqual(House.objects.count(), 2)
+        self.assertEqual(Book.objects.count(), 1)
+        self.assertEqual(Character.allegiances.through.objects.count(), 4)
+
+    def test_warm_cover_cache_skips_downloads(self):
+        with redirect_stdout(StringIO()):
+            self.populate(type='books')
+            self.populate(type='books')
+        self.assertEqual(len(self.cover_requests()), 1)
+        self.assertEqual(bytes(Book.objects.get().cover.image), b'cover-agot')
+
+    def test_import_renders_cover_variants(self):
+        RecordedApiHandler.covers['9780553103540'] = make_jpeg((300, 450))
+        with redirect_stdout(StringIO()):
+            self.populate(type='books')
+        rendered = sorted(
+            name for _, _, files in os.walk(os.path.join(self.cache_dir, 'variants')) for name in files
+        )
+        self.assertEqual(rendered, ['full.jpeg', 'full.webp', 'medium.jpeg', 'medium.webp', 'thumb.jpeg', 'thumb.webp'])
+        with patch.object(covers.render_pool, 'run') as render, \
+                override_settings(COVER_VARIANTS_DIR=os.path.join(self.cache_dir, 'variants')):
+            response = self.client.get(reverse('book-cover', args=[Book.objects.get().pk]), {'size': 'thumb'})
+        self.assertEqual(response.status_code, 200)
+        render.assert_not_called()
+
+        # Título novo muda a chave do render: o diretório antigo é apagado na próxima importação
+        old_dirs = glob.glob(os.path.join(self.cache_dir, 'variants', '*', '*'))
+        records = copy.deepcopy(RECORDED_API)
+        records['books'][0]['name'] = 'A Game of Thrones (edição revista)'
+        RecordedApiHandler.records = records
+        out = StringIO()
+        with redirect_stdout(out):
+            self.populate(type='books')
+        self.assertIn('1 renderizadas, 0 com erro, 1 antigas apagadas', out.getvalue())
+        new_dirs = glob.glob(os.path.join(self.cache_dir, 'variants', '*', '*'))
+        self.assertEqual(len(new_dirs), 1)
+        self.assertNotEqual(new_dirs, old_dirs)
+
+    def test_invalid_cover_does_not_stop_import(self):
+        out = StringIO()
+        with redirect_stdout(out):
+            self.populate(type='books')
+        self.assertIn('variantes de capa: 0 renderizadas, 1 com erro, 0 antigas apagadas', out.getvalue())
+        self.assertEqual(Book.objects.count(), 1)
+
+    def test_sync_reimport_of_stable_data_writes_nothing(self):
+        with redirect_stdout(StringIO()):
+            self.populate()
+        out = StringIO()
+        with redirect_stdout(out), CaptureQueriesContext(connection) as queries:
+            self.populate(sync=True)
+        writes = [q['sql'] for q in queries.captured_queries
+                  if q['sql'].startswith(('INSERT', 'UPDATE', 'DELETE'))]
+        self.assertEqual(writes, [])
+        self.assertIn('personagens: 0 inseridos, 0 atualizados, 5 sem mudança, 0 removidos', out.getvalue())
+
+    def test_sync_updates_changed_and_deletes_missing(self):
+        with redirect_stdout(StringIO()):
+            self.populate()
+            records = copy.deepcopy(RECORDED_API)
+            records['characters'][0]['culture'] = 'Northmen'
+            del records['characters'][4]
+            RecordedApiHandler.records = records
+            out = StringIO()
+            with redirect_stdout(out):
+                self.populate(sync=True)
+        self.assertIn('personagens: 0 inseridos, 1 atualizados, 3 sem mudança, 1 removidos', out.getvalue())
+        self.assertEqual(Character.objects.get(external_id=1).culture, 'Northmen')
+        self.assertFalse(Character.objects.filter(external_id=5).exists())
+
+    def test_import_bumps_resource_versions(self):
+        with redirect_stdout(StringIO()):
+            self.populate()
+        version = ResourceVersion.objects.get(label='characters.character').version
+        with redirect_stdout(StringIO()):
+            self.populate(sync=True)
+        self.assertEqual(ResourceVersion.objects.get(label='characters.character').version, version)
+        records = copy.deepcopy(RECORDED_API)
+        records['characters'][0]['culture'] = 'Northmen'
+        RecordedApiHandler.records = records
+        with redirect_stdout(StringIO()):
+            self.populate(sync=True)
+        self.assertGreater(ResourceVersion.objects.get(label='characters.character').version, version)
+
+    def test_dump_and_load_snapshot(self):
+        snapshot = os.path.join(self.cache_dir, 'snapshot.ndjson')
+        with redirect_stdout(StringIO()):
+            self.populate(dump=snapshot)
+        with open(snapshot) as f:
+            self.assertEqual(sum(1 for _ in f), 8)
+        Book.objects.all().delete()
+        Character.objects.all().delete()
+        House.objects.all().delete()
+
+        RecordedApiHandler.requests_seen = []
+        with redirect_stdout(StringIO()):
+            self.populate(from_file=snapshot, refresh_covers=True)
+        # Nem páginas nem capas: a capa vem do cache em disco
+        self.assertEqual(RecordedApiHandler.requests_seen, [])
+        self.assertEqual(BookCover.objects.get().image, b'cover-agot')
+        self.assertEqual(Character.objects.count(), 5)
+        self.assertEqual(Character.objects.get(external_id=3).father.external_id, 1)
+        self.assertEqual(House.objects.get(external_id=1).sworn_members.count(), 2)
+        self.assertEqual(Book.objects.get().pov_characters.count(), 1)
+
+    def test_profile_report(self):
+        report = os.path.join(self.cache_dir, 'profile.json')
+        out = StringIO()
+        with redirect_stdout(out):
+            self.populate(profile_json=report)
+        self.assertIn('pico (KB)', out.getvalue())
+        with open(report) as f:
+            data = json.load(f)
+        phases = {p['phase']: p for p in data['phases']}
+        self.assertEqual(list(phases), ['fetch', 'covers', 'upsert', 'fk', 'm2m', 'variants'])
+        self.assertEqual(phases['fetch']['http_requests'], 3)
+        self.assertEqual(phases['covers']['http_requests'], 1)
+        self.assertEqual(phases['upsert']['rows'], 9)
+        self.assertGreater(phases['m2m']['queries'], 0)
+        self.assertEqual(data['total']['rows'], sum(p['rows'] for p in data['phases']))
+
+    def test_invalid_snapshot(self):
+        snapshot = os.path.join(self.cache_dir, 'snapshot.ndjson')
+        with open(snapshot, 'w') as f:
+            f.write('{"resource": "characters", "data": {}}\n{quebrado\n')
+        with redirect_stdout(StringIO()), self.assertRaisesMessage(CommandError, 'snapshot.ndjson:2'):
+            self.populate(from_file=snapshot)
+
+    def test_sync_removes_stale_links(self):
+        with redirect_stdout(StringIO()):
+            self.populate()
+            records = copy.deepcopy(RECORDED_API)
+            records['characters'][1]['allegiances'] = [f'{API}/houses/2']
+            RecordedApiHandler.records = records
+            self.populate()
+            catelyn = Character.objects.get(external_id=2)
+            self.assertEqual(catelyn.allegiances.count(), 2)
+            self.populate(sync=True)
+        self.assertEqual(list(catelyn.allegiances.values_list('external_id', flat=True)), [2])
+        self.assertEqual(Character.allegiances.through.objects.count(), 3)
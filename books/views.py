@@ -1,35 +1,50 @@
-from itertools import chain
 from rest_framework import viewsets
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from django.conf import settings
 from django.http import HttpResponse
-from books.models import Book
+from django.utils.cache import get_conditional_response
+from books import covers, rendering
+from books.models import Book, BookCover
 from books.serializers import BookSerializer
-import base64
 from oauth2_provider.contrib.rest_framework import OAuth2Authentication
-from PIL import Image, ImageDraw, ImageFont
-from io import BytesIO
 
+from characters.models import Character
 from characters.serializers import CharacterSerializer
+from houses.models import House
+from core.http import file_response
+from core.pool import Saturated
+from core.views import CachedResponseViewSetMixin, EagerLoadingViewSetMixin, MultiGetViewSetMixin
 
-class BookViewSet(viewsets.ModelViewSet):
+class BookViewSet(CachedResponseViewSetMixin, MultiGetViewSetMixin, EagerLoadingViewSetMixin, viewsets.ModelViewSet):
     queryset = Book.objects.all()
     serializer_class = BookSerializer
+    version_models = (Book, BookCover, Character, House)
+    cache_actions = ('list', 'retrieve', 'characters', 'pov_characters', 'all_pov_characters')
+    filter_fields = {
+        'publisher': 'publisher',
+        'media_type': 'media_type',
+        'released_after': 'released__gte',
+        'released_before': 'released__lte',
+    }
     authentication_classes = [OAuth2Authentication]
     
     @action(detail=False, methods=['get'])
     def all_pov_characters(self, request, pk=None):
-        books = Book.objects.prefetch_related('pov_characters')
-        all_pov_chars = set(chain.from_iterable(book.pov_characters.all() for book in books))
-        serializer = CharacterSerializer(all_pov_chars, many=True, context={'request': request})
-        return Response(serializer.data)
+        # is_pov é recalculado na importação e quando a relação muda
+        characters = CharacterSerializer.setup_eager_loading(
+            Character.objects.filter(is_pov=True), self.get_serializer_context(),
+        )
+        page = self.paginate_queryset(characters)
+        serializer = CharacterSerializer(page, many=True, context={'request': request})
+        return self.get_paginated_response(serializer.data)
     
     
     @action(detail=True, methods=['get'])
     def pov_characters(self, request, pk=None):
         book = self.get_object()
         
-        pov_characters = book.pov_characters.all()
+        pov_characters = CharacterSerializer.setup_eager_loading(book.pov_characters.all(), self.get_serializer_context())
         serializer = CharacterSerializer(pov_characters, many=True, context={'request': request})
         return Response(serializer.data)
     
@@ -38,75 +53,48 @@ class BookViewSet(viewsets.ModelViewSet):
     def characters(self, request, pk=None):
         book = self.get_object()
         
-        characters = book.characters.all()
+        characters = CharacterSerializer.setup_eager_loading(book.characters.all(), self.get_serializer_context())
         serializer = CharacterSerializer(characters, many=True, context={'request': request})
         return Response(serializer.data)
     
     
-    # @action(detail=True, methods=['get'])
-    # def cover(self, request, pk=None):
-    #     book = self.get_object()
-        
-    #     if not book.cover_base64:
-    #         return Response({'error': 'No cover image available'}, status=404)
-        
-    #     try:
-    #         image_data = base64.b64decode(book.cover_base64)
-    #         return HttpResponse(image_data, content_type='image/jpeg')
-    #     except:
-    #         return Response({'error': 'Invalid image data'}, status=400)
-    
-    
     @action(detail=True, methods=['get'])
     def cover(self, request, pk=None):
         book = self.get_object()
+        size = request.query_params.get('size', 'full')
+        if size not in rendering.SIZES:
+            return Response({'error': f"size deve ser um de: {', '.join(rendering.SIZES)}"}, status=400)
         
-        if not book.cover_base64:
-            return Response({'error': 'No cover image available'}, status=404)
+        inputs = covers.cover_inputs([book.pk]).get(book.pk)
+        if inputs is None:
+            return Response({'error': 'Livro sem capa'}, status=404)
         
+        key, title, pov_names = inputs
+        fmt = 'webp' if accepts_webp(request) else 'jpeg'
+        etag = f'"{key}-{size}-{fmt}"'
+        headers = {'ETag': etag, 'Vary': 'Accept'}
+        if get_conditional_response(request._request, etag=etag) is not None:
+            return HttpResponse(status=304, headers=headers)
+        
+        # As variantes são geradas na importação; aqui só se a capa mudou depois
         try:
-            image_data = base64.b64decode(book.cover_base64)
-            image = Image.open(BytesIO(image_data))
-            
-            # Criar uma nova camada para o fundo semi transparente
-            overlay = Image.new('RGBA', image.size, (0, 0, 0, 0))
-            draw = ImageDraw.Draw(overlay)
-            
-            try:
-                title_font = ImageFont.truetype("arial.ttf", 30)
-                chars_font = ImageFont.truetype("arial.ttf", 20)
-            except:
-                title_font = ImageFont.load_default()
-                chars_font = ImageFont.load_default()
-            
-            title_position = (10, 50)
-            pov_chars_position = (30, 100)
-            
-            pov_chars = "".join(i.name + "\n" for i in book.pov_characters.all())
-            
-            # Calcular o tamanho do texto para criar o retângulo de fundo
-            title_bbox = draw.textbbox(title_position, book.name, font=title_font)
-            pov_chars_bbox = draw.textbbox(pov_chars_position, pov_chars, font=chars_font)
-            
-            draw.rounded_rectangle([title_bbox[0]-5, title_bbox[1]-5, title_bbox[2]+5, title_bbox[3]+5],
-                        radius=10,
-                        fill=(0, 0, 0, 64))
-            draw.rounded_rectangle([pov_chars_bbox[0]-5, pov_chars_bbox[1]-5, pov_chars_bbox[2]+5, pov_chars_bbox[3]+5], 
-                        radius=10,
-                        fill=(0, 0, 0, 64))
-            
-            draw.text(title_position, book.name, font=title_font, fill=(255, 255, 255, 170))
-            draw.text(pov_chars_position, pov_chars, font=chars_font, fill=(255, 255, 255, 170))
-            
-            # Combinar a imagem original com a camada de overlay
-            image = Image.alpha_composite(image.convert('RGBA'), overlay)
-            
-            image = image.convert('RGB')
-            
-            buffer = BytesIO()
-            image.save(buffer, format='JPEG')
-            buffer.seek(0)
-            
-            return HttpResponse(buffer, content_type='image/jpeg')
+            covers.ensure_variants(
+                settings.COVER_VARIANTS_DIR, book.pk, key, title, pov_names, pool=covers.render_pool,
+            )
+        except Saturated:
+            # Inclui TimedOut: render lento demais responde igual
+            return Response(
+                {'error': 'Renderização de capas ocupada, tente de novo mais tarde'},
+                status=503, headers={'Retry-After': str(settings.COVER_RENDER_RETRY_AFTER)},
+            )
         except Exception as e:
-            return Response({'error': f'Error processing image: {str(e)}'}, status=400)
+            return Response({'error': f'Erro ao processar a imagem: {e}'}, status=400)
+        
+        path = rendering.variant_path(settings.COVER_VARIANTS_DIR, key, size, fmt)
+        return file_response(request, path, rendering.FORMATS[fmt][1], headers=headers)
+
+
+def accepts_webp(request):
+    """WebP só quando o cliente o lista explicitamente; */* continua recebendo JPEG."""
+    accept = request.META.get('HTTP_ACCEPT', '')
+    return 'image/webp' in (media.split(';')[0].strip() for media in accept.split(','))
@@ -0,0 +1,40 @@
+from django.db import connection
+
+from characters.models import Character
+
+DEFAULT_DEPTH = 3
+MAX_DEPTH = 10
+
+# Como cada passo da caminhada chega aos vizinhos de `w.id` (o nó atual):
+# - ancestors: pai e mãe;
+# - descendants: filhos, pelas colunas de children_father/children_mother;
+# - family: pai, mãe, cônjuge, filhos e quem tem w.id como cônjuge.
+STEPS = {
+    'ancestors': 'JOIN {table} c ON c.id = w.id JOIN {table} n ON n.id IN (c.father_id, c.mother_id)',
+    'descendants': 'JOIN {table} n ON w.id IN (n.father_id, n.mother_id)',
+    'family': (
+        'JOIN {table} c ON c.id = w.id '
+        'JOIN {table} n ON (n.id IN (c.father_id, c.mother_id, c.spouse_id) '
+        'OR w.id IN (n.father_id, n.mother_id, n.spouse_id))'
+    ),
+}
+
+# O UNION descarta linhas (id, profundidade) repetidas e o limite de
+# profundidade encerra a recursão mesmo com ciclos nos dados
+WALK_SQL = """
+WITH RECURSIVE walk(id, depth) AS (
+    SELECT CAST(%s AS BIGINT), 0
+    UNION
+    SELECT n.id, w.depth + 1 FROM walk w {step} WHERE w.depth < %s
+)
+SELECT id, MIN(depth) FROM walk GROUP BY id
+"""
+
+
+def walk(character_id, relation, depth):
+    """{id: distância} dos personagens a até `depth` passos, com uma CTE recursiva."""
+    table = connection.ops.quote_name(Character._meta.db_table)
+    sql = WALK_SQL.format(step=STEPS[relation].format(table=table))
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [character_id, depth])
+        return dict(cursor.fetchall())
@@ -0,0 +1,213 @@
+import logging
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from collections import deque
+
+from django.conf import settings
+from django.db import DatabaseError, connection
+
+from books.models import Book
+from characters.models import Character
+from core.models import ResourceVersion
+from houses.models import House
+
+# Tipos de nó, na ordem em que ocupam os índices do grafo
+NODE_TYPES = ('character', 'house', 'book')
+
+# Tipo de cada aresta; o índice é o que fica guardado em `kinds`
+EDGE_KINDS = ('father', 'mother', 'spouse', 'allegiance', 'sworn', 'lord', 'overlord', 'cadet', 'book', 'pov')
+
+MODELS = {'character': Character, 'house': House, 'book': Book}
+
+MAX_PATH_HOPS = 8
+# Livros ligam centenas de personagens: a vizinhança cresce rápido
+MAX_NEIGHBORHOOD_HOPS = 3
+
+
+class GraphIndex:
+    """
+    Grafo não dirigido de personagens, casas e livros em CSR: os vizinhos
+    do nó n são indices[indptr[n]:indptr[n + 1]], com o tipo de cada aresta
+    em kinds. Cada nó é um inteiro; os ids do banco ficam em arrays
+    ordenados, um por tipo, e a conversão é uma busca binária.
+    """
+
+    def __init__(self, ids, edges, stamp=None):
+        self.stamp = stamp
+        self.ids = {t: array('q', sorted(ids[t])) for t in NODE_TYPES}
+        self.offsets, total = {}, 0
+        for t in NODE_TYPES:
+            self.offsets[t] = total
+            total += len(self.ids[t])
+        self.size = total
+
+        degree = array('q', bytes(8 * (total + 1)))
+        pairs = []
+        for kind, left_type, right_type, rows in edges:
+            k = EDGE_KINDS.index(kind)
+            for left, right in rows:
+                a, b = self.node(left_type, left), self.node(right_type, right)
+                if a is None or b is None or a == b:
+                    continue
+                pairs.append((a, b, k))
+                degree[a + 1] += 1
+                degree[b + 1] += 1
+        for n in range(total):
+            degree[n + 1] += degree[n]
+        self.indptr = degree
+        self.indices = array('q', bytes(8 * degree[total]))
+        self.kinds = array('b', bytes(degree[total]))
+        cursor = array('q', degree[:total])
+        for a, b, k in pairs:
+            for src, dst in ((a, b), (b, a)):
+                self.indices[cursor[src]] = dst
+                self.kinds[cursor[src]] = k
+                cursor[src] += 1
+
+    @classmethod
+    def load(cls, stamp=None):
+        ids = {t: MODELS[t].objects.values_list('id', flat=True) for t in NODE_TYPES}
+        family = list(Character.objects.values_list('id', 'father_id', 'mother_id', 'spouse_id'))
+        houses = list(House.objects.values_list('id', 'overlord_id', 'current_lord_id', 'heir_id', 'founder_id'))
+        edges = [
+            ('father', 'character', 'character', ((c, f) for c, f, _, _ in family if f)),
+            ('mother', 'character', 'character', ((c, m) for c, _, m, _ in family if m)),
+            ('spouse', 'character', 'character', ((c, s) for c, _, _, s in family if s)),
+            ('allegiance', 'character', 'house', Character.allegiances.through.objects.values_list('character_id', 'house_id')),
+            ('sworn', 'house', 'character', House.sworn_members.through.objects.values_list('house_id', 'character_id')),
+            ('lord', 'house', 'character', ((h, c) for h, _, *lords in houses for c in lords if c)),
+            ('overlord', 'house', 'house', ((h, o) for h, o, *_ in houses if o)),
+            ('cadet', 'house', 'house', House.cadet_branches.through.objects.values_list('from_house_id', 'to_house_id')),
+            ('book', 'book', 'character', Book.characters.through.objects.values_list('book_id', 'character_id')),
+            ('pov', 'book', 'character', Book.pov_characters.through.objects.values_list('book_id', 'character_id')),
+        ]
+        return cls(ids, edges, stamp)
+
+    def node(self, node_type, pk):
+        ids = self.ids[node_type]
+        i = bisect_left(ids, pk)
+        if i == len(ids) or ids[i] != pk:
+            return None
+        return self.offsets[node_type] + i
+
+    def describe(self, n):
+        """(tipo, id no banco) do nó n."""
+        for t in reversed(NODE_TYPES):
+            if n >= self.offsets[t]:
+                return t, self.ids[t][n - self.offsets[t]]
+
+    def neighbors(self, n):
+        for i in range(self.indptr[n], self.indptr[n + 1]):
+            yield self.indices[i], self.kinds[i]
+
+    def bfs(self, start, max_hops, target=None):
+        """
+        Busca em largura a partir de `start` até `max_hops` arestas. Retorna
+        ({nó: distância}, {nó: (nó anterior, tipo da aresta)}), parando ao
+        alcançar `target`.
+        """
+        depth, parent = {start: 0}, {}
+        queue = deque([start])
+        while queue:
+            n = queue.popleft()
+            if n == target or depth[n] == max_hops:
+                continue
+            for m, k in self.neighbors(n):
+                if m not in depth:
+                    depth[m] = depth[n] + 1
+                    parent[m] = (n, k)
+                    if m == target:
+                        return depth, parent
+                    queue.append(m)
+        return depth, parent
+
+    def shortest_path(self, start, target, max_hops):
+        """[(nó, tipo da aresta que chegou nele)] de start a target, ou None."""
+        _, parent = self.bfs(start, max_hops, target)
+        if target != start and target not in parent:
+            return None
+        path = [(target, None)]
+        while path[-1][0] != start:
+            previous, kind = parent[path[-1][0]]
+            path[-1] = (path[-1][0], EDGE_KINDS[kind])
+            path.append((previous, None))
+        return path[::-1]
+
+
+def current_stamp():
+    labels = [MODELS[t]._meta.label_lower for t in NODE_TYPES]
+    return tuple(ResourceVersion.objects.filter(label__in=labels).order_by('label').values_list('version', 'modified'))
+
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_index = None
+_checked = 0.0
+_rebuilding = False
+
+
+def get_index():
+    """
+    O índice do processo. A versão dos models é conferida no máximo a cada
+    GRAPH_CHECK_INTERVAL segundos; se mudou, o índice novo é montado em
+    segundo plano e o atual continua respondendo até a troca.
+    """
+    global _checked
+    if _index is None:
+        # Ainda não há o que servir: a primeira montagem é síncrona
+        with _lock:
+            if _index is None:
+                load(current_stamp())
+        return _index
+    now = time.monotonic()
+    if now - _checked >= settings.GRAPH_CHECK_INTERVAL:
+        _checked = now
+        stamp = current_stamp()
+        if stamp != _index.stamp:
+            rebuild(stamp)
+    return _index
+
+
+def rebuild(stamp):
+    """Dispara uma remontagem, se ainda não houver uma em andamento."""
+    global _rebuilding
+    with _lock:
+        if _rebuilding:
+            return
+        _rebuilding = True
+    if settings.GRAPH_BACKGROUND_REBUILD:
+        threading.Thread(target=load_in_background, args=(stamp,), name='graph-rebuild', daemon=True).start()
+    else:
+        load(stamp)
+
+
+def load_in_background(stamp):
+    try:
+        load(stamp)
+    finally:
+        connection.close()
+
+
+def load(stamp):
+    global _index, _rebuilding
+    try:
+        _index = GraphIndex.load(stamp)
+    except Exception:
+        if _index is None:
+            raise
+        # Segue com o índice anterior; a próxima conferência tenta de novo
+        logger.exception('falha ao remontar o grafo de relações')
+    finally:
+        _rebuilding = False
+
+
+def warm():
+    """Monta o índice na subida do servidor (wsgi.py e asgi.py)."""
+    try:
+        get_index()
+    except DatabaseError:
+        # Banco ainda sem as migrations: o índice é montado na primeira consulta
+        pass
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.4 on 2026-10-18 08:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('characters', '0003_alter_character_options'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='character',
+            name='fingerprint',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True),
+        ),
+    ]
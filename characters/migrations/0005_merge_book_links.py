@@ -0,0 +1,53 @@
+# Generated by Django 5.0.4 on 2026-10-18 08:33
+
+from django.db import migrations
+
+# (campo em Character, campo em Book) de cada relação duplicada
+RELATIONS = (('books', 'characters'), ('pov_books', 'pov_characters'))
+
+
+def copy_links(source, target):
+    existing = set(target.objects.values_list('book_id', 'character_id'))
+    missing = {
+        pair for pair in source.objects.values_list('book_id', 'character_id')
+        if pair not in existing
+    }
+    target.objects.bulk_create(
+        [target(book_id=book, character_id=character) for book, character in missing],
+        batch_size=500,
+        ignore_conflicts=True,
+    )
+
+
+def merge_into_book_tables(apps, schema_editor):
+    Book = apps.get_model('books', 'Book')
+    Character = apps.get_model('characters', 'Character')
+    for char_field, book_field in RELATIONS:
+        copy_links(getattr(Character, char_field).through, getattr(Book, book_field).through)
+
+
+def split_from_book_tables(apps, schema_editor):
+    Book = apps.get_model('books', 'Book')
+    Character = apps.get_model('characters', 'Character')
+    for char_field, book_field in RELATIONS:
+        copy_links(getattr(Book, book_field).through, getattr(Character, char_field).through)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0005_book_fingerprint'),
+        ('characters', '0004_character_fingerprint'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_into_book_tables, split_from_book_tables),
+        migrations.RemoveField(
+            model_name='character',
+            name='books',
+        ),
+        migrations.RemoveField(
+            model_name='character',
+            name='pov_books',
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.0.4 on 2026-10-18 08:45
+
+from django.db import migrations, models
+from django.db.models import Exists, OuterRef
+
+
+def fill_is_pov(apps, schema_editor):
+    Book = apps.get_model('books', 'Book')
+    Character = apps.get_model('characters', 'Character')
+    pov = Book.pov_characters.through.objects.filter(character_id=OuterRef('pk'))
+    Character.objects.filter(Exists(pov)).update(is_pov=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('characters', '0005_merge_book_links'),
+        ('houses', '0003_house_fingerprint'),
+        ('books', '0007_move_cover_to_bookcover'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='character',
+            name='is_pov',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='character',
+            index=models.Index(fields=['is_pov', 'id'], name='character_pov_idx'),
+        ),
+        migrations.RunPython(fill_is_pov, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.0.4 on 2026-10-18 08:52
+
+from django.db import migrations, models
+
+from core.search import CreateSearchIndex
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('characters', '0006_character_is_pov'),
+        ('houses', '0003_house_fingerprint'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='character',
+            index=models.Index(fields=['name'], name='character_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='character',
+            index=models.Index(fields=['gender'], name='character_gender_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='character',
+            index=models.Index(fields=['culture'], name='character_culture_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='character',
+            index=models.Index(fields=['born'], name='character_born_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='character',
+            index=models.Index(fields=['died'], name='character_died_idx'),
+        ),
+        CreateSearchIndex('characters_character', ['name', 'culture', 'titles', 'aliases']),
+    ]
@@ -1,5 +1,6 @@
 from itertools import chain
 from django.db import models
+from django.db.models import Exists, OuterRef
 
 from books.models import Book
 
@@ -28,8 +29,22 @@ from books.models import Book
 }
 """
 
+class CharacterQuerySet(models.QuerySet):
+    def refresh_pov(self):
+        """Recalcula is_pov no banco, gravando só as linhas que mudaram."""
+        pov = Book.pov_characters.through.objects.filter(character_id=OuterRef('pk'))
+        changed = 0
+        for stale, value in ((self.filter(Exists(pov), is_pov=False), True),
+                             (self.filter(~Exists(pov), is_pov=True), False)):
+            if stale.exists():
+                changed += stale.update(is_pov=value)
+        return changed
+
+
 class Character(models.Model):
     external_id = models.IntegerField(unique=True)
+    # sha256 do registro de origem normalizado, usado pelo populate_db --sync
+    fingerprint = models.CharField(max_length=64, blank=True, null=True, editable=False)
     name = models.CharField(max_length=255, blank=True, null=True)
     gender = models.CharField(max_length=50, blank=True, null=True)
     culture = models.CharField(max_length=255, blank=True, null=True)
@@ -57,22 +72,30 @@ class Character(models.Model):
         related_name='members',
         blank=True
     )
-    books = models.ManyToManyField(
-        'books.Book',
-        related_name='book_characters',
-        blank=True
-    )
-    pov_books = models.ManyToManyField(
-        'books.Book',
-        related_name='book_pov_characters',  
-        blank=True
-    )
+    # books e pov_books são os acessores reversos de Book.characters e
+    # Book.pov_characters: cada relação tem uma única tabela intermediária
+
+    # True se o personagem é POV de algum livro; mantido por refresh_pov
+    is_pov = models.BooleanField(default=False, editable=False)
 
     tv_series = models.JSONField(default=list, blank=True)
     played_by = models.JSONField(default=list, blank=True)
 
+    objects = CharacterQuerySet.as_manager()
+
+    # Colunas do ?search= (core.search); as mesmas da migration que cria o índice
+    search_fields = ('name', 'culture', 'titles', 'aliases')
+
     class Meta:
         ordering = ['id']
+        indexes = [
+            models.Index(fields=['is_pov', 'id'], name='character_pov_idx'),
+            models.Index(fields=['name'], name='character_name_idx'),
+            models.Index(fields=['gender'], name='character_gender_idx'),
+            models.Index(fields=['culture'], name='character_culture_idx'),
+            models.Index(fields=['born'], name='character_born_idx'),
+            models.Index(fields=['died'], name='character_died_idx'),
+        ]
 
     def __str__(self):
         return self.name or f"Character {self.external_id}"
@@ -1,34 +1,45 @@
 from rest_framework import serializers
+from core.fields import CachedHyperlinkedIdentityField, CachedHyperlinkedRelatedField
+from core.serializers import DynamicFieldsMixin, EagerLoadingMixin
 from characters.models import Character
 
-class CharacterSerializer(serializers.HyperlinkedModelSerializer):
-    url = serializers.HyperlinkedIdentityField(
+class CharacterSerializer(DynamicFieldsMixin, EagerLoadingMixin, serializers.HyperlinkedModelSerializer):
+    expandable_fields = {
+        'father': 'characters.serializers.CharacterSerializer',
+        'mother': 'characters.serializers.CharacterSerializer',
+        'spouse': 'characters.serializers.CharacterSerializer',
+        'allegiances': 'houses.serializers.HouseSerializer',
+        'books': 'books.serializers.BookSerializer',
+        'pov_books': 'books.serializers.BookSerializer',
+    }
+
+    url = CachedHyperlinkedIdentityField(
         view_name='character-detail',
         lookup_field='pk'
     )
-    father = serializers.HyperlinkedRelatedField(
+    father = CachedHyperlinkedRelatedField(
         view_name='character-detail',
         read_only=True
     )
-    mother = serializers.HyperlinkedRelatedField(
+    mother = CachedHyperlinkedRelatedField(
         view_name='character-detail',
         read_only=True
     )
-    spouse = serializers.HyperlinkedRelatedField(
+    spouse = CachedHyperlinkedRelatedField(
         view_name='character-detail',
         read_only=True
     )
-    allegiances = serializers.HyperlinkedRelatedField(
+    allegiances = CachedHyperlinkedRelatedField(
         many=True,
         view_name='house-detail',
         read_only=True
     )
-    books = serializers.HyperlinkedRelatedField(
+    books = CachedHyperlinkedRelatedField(
         many=True,
         view_name='book-detail',
         read_only=True
     )
-    pov_books = serializers.HyperlinkedRelatedField(
+    pov_books = CachedHyperlinkedRelatedField(
         many=True,
         view_name='book-detail',
         read_only=True
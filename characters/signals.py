@@ -0,0 +1,24 @@
+from django.db.models.signals import m2m_changed, post_delete
+from django.dispatch import receiver
+
+from books.models import Book
+from characters.models import Character
+
+
+@receiver(m2m_changed, sender=Book.pov_characters.through)
+def refresh_pov_on_link(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if reverse:
+        characters = Character.objects.filter(pk=instance.pk)
+    elif pk_set:
+        characters = Character.objects.filter(pk__in=pk_set)
+    else:
+        # clear() não informa quais personagens saíram
+        characters = Character.objects.filter(is_pov=True)
+    characters.refresh_pov()
+
+
+@receiver(post_delete, sender=Book)
+def refresh_pov_on_book_delete(sender, **kwargs):
+    Character.objects.filter(is_pov=True).refresh_pov()
@@ -1,8 +1,17 @@
-from django.test import TestCase
+import threading
+import time
+from unittest.mock import patch
+
+from django.db import DatabaseError, connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework.test import APIClient
+from characters import graph
 from characters.models import Character
 from books.models import Book
+from core.pagination import HybridPagination, KeysetPagination
+from houses.models import House
 
 class CharacterViewSetTest(TestCase):
     def setUp(self):
@@ -29,7 +38,6 @@ class CharacterViewSetTest(TestCase):
             country="Test Country",
             media_type="Hardcover",
             released="2024-01-01T00:00:00Z",
-            cover_base64="base64string"
         )
         self.character.books.add(self.book)
         self.character.pov_books.add(self.book)
@@ -57,3 +65,234 @@ class CharacterViewSetTest(TestCase):
         response = self.client.get(url)
         self.assertEqual(response.status_code, 200)
         self.assertEqual(len(response.data), 1)
+
+    def create_characters(self, total):
+        house, _ = House.objects.get_or_create(external_id=1, defaults={'name': "Test House"})
+        for i in range(Character.objects.count(), total):
+            character = Character.objects.create(external_id=100 + i, name=f"Character {i}", father=self.character)
+            character.allegiances.add(house)
+            character.books.add(self.book)
+
+    def test_list_query_count_is_flat(self):
+        url = reverse('character-list')
+        self.create_characters(2)
+        # versões (ETag), count, página e um prefetch para allegiances, books e pov_books
+        with self.assertNumQueries(6):
+            self.client.get(url)
+        self.create_characters(10)
+        with self.assertNumQueries(6):
+            response = self.client.get(url)
+        self.assertEqual(len(response.data['results']), 10)
+        self.assertTrue(response.data['results'][1]['father'].endswith(f'/api/characters/{self.character.id}/'))
+        self.assertEqual(len(response.data['results'][1]['allegiances']), 1)
+
+    def test_sparse_fieldset(self):
+        self.create_characters(3)
+        url = reverse('character-list')
+        # versões (ETag), count e página; sem prefetch porque nenhuma relação M2M foi pedida
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, {'fields': 'name,culture'})
+        self.assertEqual(len(queries), 3)
+        self.assertNotIn('"titles"', queries[2]['sql'])
+        self.assertEqual(set(response.data['results'][0]), {'name', 'culture'})
+
+    def test_exclude(self):
+        url = reverse('character-detail', args=[self.character.id])
+        response = self.client.get(url, {'exclude': 'books,pov_books'})
+        self.assertNotIn('books', response.data)
+        self.assertNotIn('pov_books', response.data)
+        self.assertIn('allegiances', response.data)
+
+    def test_expand(self):
+        url = reverse('character-list')
+        self.create_characters(2)
+        # versões (ETag), count, página, books, pov_books e um prefetch por campo expandido,
+        # cada um com os prefetches das relações do serializer aninhado
+        with self.assertNumQueries(12):
+            self.client.get(url, {'expand': 'allegiances,father'})
+        self.create_characters(10)
+        with self.assertNumQueries(12):
+            response = self.client.get(url, {'expand': 'allegiances,father'})
+        allegiance = response.data['results'][1]['allegiances'][0]
+        self.assertEqual(allegiance['name'], "Test House")
+        self.assertEqual(response.data['results'][1]['father']['name'], "Test Character")
+
+    def test_keyset_pagination(self):
+        self.create_characters(5)
+        url = reverse('character-list')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, {'pagination': 'cursor', 'page_size': 2})
+        self.assertNotIn('count', response.data)
+        self.assertFalse(any('COUNT' in q['sql'] for q in queries.captured_queries))
+        seen = [r['name'] for r in response.data['results']]
+        while response.data['next']:
+            response = self.client.get(response.data['next'])
+            seen += [r['name'] for r in response.data['results']]
+        self.assertEqual(seen, list(Character.objects.values_list('name', flat=True)))
+
+    def test_page_size_is_capped(self):
+        self.create_characters(3)
+        with patch.object(HybridPagination, 'max_page_size', 2), patch.object(KeysetPagination, 'max_page_size', 2):
+            response = self.client.get(reverse('character-list'), {'page_size': 1000})
+            self.assertEqual(len(response.data['results']), 2)
+            response = self.client.get(reverse('character-list'), {'page_size': 1000, 'pagination': 'cursor'})
+            self.assertEqual(len(response.data['results']), 2)
+
+    def test_multi_get(self):
+        self.create_characters(12)
+        ids = list(Character.objects.values_list('id', flat=True)[:8])
+        url = reverse('character-list')
+        # versões (ETag), pk__in e um prefetch para allegiances, books e pov_books
+        with self.assertNumQueries(5):
+            response = self.client.get(url, {'ids': ','.join(map(str, ids + [999999]))})
+        self.assertEqual([item['name'] for item in response.data], list(
+            Character.objects.filter(id__in=ids).values_list('name', flat=True)
+        ))
+        self.assertEqual(self.client.get(url, {'ids': 'a,b'}).status_code, 400)
+
+    def test_multi_get_size_cap(self):
+        with patch('core.views.MultiGetViewSetMixin.max_batch_size', 2):
+            response = self.client.get(reverse('character-list'), {'ids': '1,2,3'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_filters(self):
+        self.create_characters(4)
+        Character.objects.filter(external_id=101).update(culture="Northmen")
+        url = reverse('character-list')
+        self.assertEqual(self.client.get(url, {'culture': 'Northmen'}).data['count'], 1)
+        self.assertEqual(self.client.get(url, {'gender': 'Male', 'name': 'Test Character'}).data['count'], 1)
+        house = House.objects.get(external_id=1)
+        self.assertEqual(self.client.get(url, {'house': house.id}).data['count'], 3)
+        self.assertEqual(self.client.get(url, {'book': self.book.id}).data['count'], 4)
+        self.assertEqual(self.client.get(url, {'house': 'abc'}).status_code, 400)
+
+    def test_search(self):
+        self.create_characters(3)
+        character = Character.objects.get(external_id=101)
+        character.aliases = ["The Daughter of the Dusk"]
+        character.save()
+        url = reverse('character-list')
+        response = self.client.get(url, {'search': 'daugh dusk'})
+        self.assertEqual([item['name'] for item in response.data['results']], ["Character 1"])
+        self.assertEqual(self.client.get(url, {'search': 'character'}).data['count'], 3)
+        # Sintaxe do FTS5 no texto do cliente não quebra a consulta
+        self.assertEqual(self.client.get(url, {'search': '"AND (*'}).status_code, 200)
+        character.delete()
+        self.assertEqual(self.client.get(url, {'search': 'dusk'}).data['count'], 0)
+
+
+class GenealogyTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        # rickard -> eddard (+ catelyn) -> robb -> (sem filhos), com um ciclo artificial
+        self.rickard = Character.objects.create(external_id=1, name="Rickard")
+        self.eddard = Character.objects.create(external_id=2, name="Eddard", father=self.rickard)
+        self.catelyn = Character.objects.create(external_id=3, name="Catelyn", spouse=self.eddard)
+        self.robb = Character.objects.create(external_id=4, name="Robb", father=self.eddard, mother=self.catelyn)
+        self.rickard.father = self.robb
+        self.rickard.save()
+
+    def names(self, response):
+        return {item['name']: item['depth'] for item in response.data['results']}
+
+    def test_ancestors(self):
+        response = self.client.get(reverse('character-ancestors', args=[self.robb.id]), {'depth': 2})
+        self.assertEqual(self.names(response), {'Robb': 0, 'Eddard': 1, 'Catelyn': 1, 'Rickard': 2})
+
+    def test_descendants_stop_at_cycles(self):
+        response = self.client.get(reverse('character-descendants', args=[self.rickard.id]), {'depth': 10})
+        self.assertEqual(self.names(response), {'Rickard': 0, 'Eddard': 1, 'Robb': 2})
+
+    def test_family_single_query_walk(self):
+        url = reverse('character-family', args=[self.eddard.id])
+        # versões (ETag), personagem, CTE, personagens e um prefetch para allegiances, books e pov_books
+        with self.assertNumQueries(7):
+            response = self.client.get(url, {'depth': 1})
+        self.assertEqual(self.names(response), {'Eddard': 0, 'Rickard': 1, 'Catelyn': 1, 'Robb': 1})
+        self.assertEqual(self.client.get(url, {'depth': 11}).status_code, 400)
+
+
+@override_settings(GRAPH_CHECK_INTERVAL=0, GRAPH_BACKGROUND_REBUILD=False)
+class GraphIndexTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.eddard = Character.objects.create(external_id=1, name="Eddard")
+        self.robb = Character.objects.create(external_id=2, name="Robb", father=self.eddard)
+        self.jon = Character.objects.create(external_id=3, name="Jon")
+        self.tyrion = Character.objects.create(external_id=4, name="Tyrion")
+        self.stark = House.objects.create(external_id=1, name="Stark")
+        self.robb.allegiances.add(self.stark)
+        self.jon.allegiances.add(self.stark)
+        self.book = Book.objects.create(
+            external_id=1, name="A Game of Thrones", isbn="1", authors=["A"], number_of_pages=1,
+            publisher="P", country="C", media_type="Hardcover", released="1996-08-01T00:00:00Z",
+        )
+        self.book.characters.add(self.jon, self.tyrion)
+
+    def test_csr_layout(self):
+        index = graph.GraphIndex.load()
+        eddard = index.node('character', self.eddard.pk)
+        self.assertEqual(list(index.neighbors(eddard)), [(index.node('character', self.robb.pk), 0)])
+        # father, duas allegiances e dois livros, guardados nos dois sentidos
+        self.assertEqual(len(index.indices), 2 * 5)
+        self.assertIsNone(index.node('character', 999))
+
+    def test_connection(self):
+        response = self.client.get(reverse('character-connection', args=[self.eddard.id]), {'to': self.tyrion.id})
+        self.assertEqual(response.data['hops'], 5)
+        self.assertEqual(
+            [(node['name'], node['via']) for node in response.data['path']],
+            [("Eddard", None), ("Robb", 'father'), ("Stark", 'allegiance'), ("Jon", 'allegiance'),
+             ("A Game of Thrones", 'book'), ("Tyrion", 'book')],
+        )
+        self.assertEqual(response.data['path'][2]['url'], f'http://testserver/api/houses/{self.stark.id}/')
+        response = self.client.get(reverse('character-connection', args=[self.eddard.id]), {'to': self.tyrion.id, 'max_hops': 4})
+        self.assertEqual(response.status_code, 404)
+
+    def test_connection_validates_each_parameter(self):
+        url = reverse('character-connection', args=[self.eddard.id])
+        self.assertIn('?to=', self.client.get(url).data['error'])
+        response = self.client.get(url, {'to': self.tyrion.id, 'max_hops': 'muitos'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('max_hops', response.data['error'])
+
+    def test_neighborhood_and_rebuild_after_write(self):
+        url = reverse('character-neighborhood', args=[self.jon.id])
+        response = self.client.get(url)
+        self.assertEqual({node['name']: node['depth'] for node in response.data['results']},
+                         {"Jon": 0, "Stark": 1, "A Game of Thrones": 1})
+        self.jon.spouse = self.tyrion
+        self.jon.save()
+        response = self.client.get(url)
+        self.assertEqual(response.data['count'], 4)
+        self.assertEqual(self.client.get(url, {'hops': 4}).status_code, 400)
+
+    def test_rebuild_runs_in_background(self):
+        current = graph.get_index()
+        started, release = threading.Event(), threading.Event()
+
+        def slow_load(stamp):
+            started.set()
+            release.wait(5)
+            raise DatabaseError('banco fora do ar')
+
+        self.jon.save()
+        with override_settings(GRAPH_BACKGROUND_REBUILD=True), \
+                patch.object(graph.GraphIndex, 'load', side_effect=slow_load) as load, \
+                self.assertLogs('characters.graph', 'ERROR'):
+            # Quem chega durante a remontagem recebe o índice anterior na hora
+            self.assertIs(graph.get_index(), current)
+            self.assertTrue(started.wait(5))
+            self.assertIs(graph.get_index(), current)
+            self.assertEqual(load.call_count, 1)
+            release.set()
+            self.wait_rebuild()
+            # A remontagem falhou: segue o índice anterior e a próxima tenta de novo
+            self.assertIs(graph.get_index(), current)
+            self.wait_rebuild()
+            self.assertEqual(load.call_count, 2)
+
+    def wait_rebuild(self):
+        deadline = time.monotonic() + 5
+        while graph._rebuilding and time.monotonic() < deadline:
+            time.sleep(0.01)
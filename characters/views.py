@@ -1,29 +1,138 @@
 from rest_framework.response import Response
 from rest_framework import viewsets
+from books.models import Book
 from books.serializers import BookSerializer
+from characters import genealogy, graph
 from characters.models import Character
 from characters.serializers import CharacterSerializer
+from houses.models import House
 from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
 from oauth2_provider.contrib.rest_framework import OAuth2Authentication
+from core.fields import detail_url
+from core.views import CachedResponseViewSetMixin, EagerLoadingViewSetMixin, MultiGetViewSetMixin
 
 
-class CharacterViewSet(viewsets.ModelViewSet):
+class CharacterViewSet(CachedResponseViewSetMixin, MultiGetViewSetMixin, EagerLoadingViewSetMixin, viewsets.ModelViewSet):
     queryset = Character.objects.all()
     serializer_class = CharacterSerializer
+    version_models = (Character, Book, House)
+    cache_actions = (
+        'list', 'retrieve', 'books', 'pov_books', 'ancestors', 'descendants', 'family',
+        'connection', 'neighborhood',
+    )
+    filter_fields = {
+        'name': 'name',
+        'gender': 'gender',
+        'culture': 'culture',
+        'born': 'born',
+        'died': 'died',
+        'house': 'allegiances',
+        'book': 'books',
+    }
     # authentication_classes = [OAuth2Authentication]
     # permission_classes = [IsAuthenticated]
 
     @action(detail=True, methods=['get'])
     def books(self, request, pk=None):
         character = self.get_object()
-        books = character.books.all()
+        books = BookSerializer.setup_eager_loading(character.books.all(), self.get_serializer_context())
         serializer = BookSerializer(books, many=True, context={'request': request})
         return Response(serializer.data)
     
     @action(detail=True, methods=['get'])
     def pov_books(self, request, pk=None):
         character = self.get_object()
-        books = character.pov_books.all()
+        books = BookSerializer.setup_eager_loading(character.pov_books.all(), self.get_serializer_context())
         serializer = BookSerializer(books, many=True, context={'request': request})
         return Response(serializer.data)
+
+    @action(detail=True, methods=['get'])
+    def ancestors(self, request, pk=None):
+        return self.genealogy('ancestors')
+
+    @action(detail=True, methods=['get'])
+    def descendants(self, request, pk=None):
+        return self.genealogy('descendants')
+
+    @action(detail=True, methods=['get'])
+    def family(self, request, pk=None):
+        return self.genealogy('family')
+
+    def genealogy(self, relation):
+        """Subgrafo inteiro numa resposta: cada personagem com a distância até o pedido."""
+        try:
+            depth = int(self.request.query_params.get('depth', genealogy.DEFAULT_DEPTH))
+        except ValueError:
+            depth = 0
+        if not 1 <= depth <= genealogy.MAX_DEPTH:
+            return Response({'error': f'depth deve estar entre 1 e {genealogy.MAX_DEPTH}'}, status=400)
+
+        character = self.get_object()
+        distances = genealogy.walk(character.pk, relation, depth)
+        characters = list(CharacterSerializer.setup_eager_loading(
+            Character.objects.filter(pk__in=list(distances)), self.get_serializer_context(),
+        ))
+        nodes = CharacterSerializer(characters, many=True, context=self.get_serializer_context()).data
+        for node, obj in zip(nodes, characters):
+            node['depth'] = distances[obj.pk]
+        nodes.sort(key=lambda node: node['depth'])
+        return Response({'depth': depth, 'count': len(nodes), 'results': nodes})
+
+    @action(detail=True, methods=['get'])
+    def connection(self, request, pk=None):
+        """Menor ligação até `?to=` por família, casas e livros em comum."""
+        character = self.get_object()
+        try:
+            target = int(request.query_params['to'])
+        except (KeyError, ValueError):
+            return Response({'error': 'Informe ?to=<id do personagem>'}, status=400)
+        try:
+            max_hops = int(request.query_params.get('max_hops', graph.MAX_PATH_HOPS))
+        except ValueError:
+            return Response({'error': f'max_hops deve ser um inteiro entre 1 e {graph.MAX_PATH_HOPS}'}, status=400)
+        max_hops = min(max(max_hops, 1), graph.MAX_PATH_HOPS)
+
+        index = graph.get_index()
+        start, end = index.node('character', character.pk), index.node('character', target)
+        if end is None:
+            return Response({'error': 'Personagem de destino não encontrado'}, status=404)
+        path = index.shortest_path(start, end, max_hops)
+        if path is None:
+            return Response({'error': f'Sem ligação em até {max_hops} passos'}, status=404)
+        nodes = self.graph_nodes(index, [n for n, _ in path])
+        for node, (_, via) in zip(nodes, path):
+            node['via'] = via
+        return Response({'hops': len(path) - 1, 'path': nodes})
+
+    @action(detail=True, methods=['get'])
+    def neighborhood(self, request, pk=None):
+        """Personagens, casas e livros a até `?hops=N` arestas."""
+        character = self.get_object()
+        try:
+            hops = int(request.query_params.get('hops', 1))
+        except ValueError:
+            hops = 0
+        if not 1 <= hops <= graph.MAX_NEIGHBORHOOD_HOPS:
+            return Response({'error': f'hops deve estar entre 1 e {graph.MAX_NEIGHBORHOOD_HOPS}'}, status=400)
+
+        index = graph.get_index()
+        depth, _ = index.bfs(index.node('character', character.pk), hops)
+        ordered = sorted(depth, key=depth.get)
+        nodes = self.graph_nodes(index, ordered)
+        for node, n in zip(nodes, ordered):
+            node['depth'] = depth[n]
+        return Response({'hops': hops, 'count': len(nodes), 'results': nodes})
+
+    def graph_nodes(self, index, nodes):
+        """{type, id, url, name} de cada nó, com uma query de nomes por tipo."""
+        described = [index.describe(n) for n in nodes]
+        names = {}
+        for node_type in graph.NODE_TYPES:
+            pks = [pk for t, pk in described if t == node_type]
+            if pks:
+                names[node_type] = dict(graph.MODELS[node_type].objects.filter(pk__in=pks).values_list('pk', 'name'))
+        return [
+            {'type': t, 'id': pk, 'url': detail_url(f'{t}-detail', pk, self.request), 'name': names[t].get(pk)}
+            for t, pk in described
+        ]
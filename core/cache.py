@@ -0,0 +1,84 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from core import metrics
+
+PREFIX = 'api-response'
+LOCK_TIMEOUT = 30
+WAIT_TIMEOUT = 5
+WAIT_INTERVAL = 0.05
+
+
+def response_key(request, etag):
+    """
+    Chave da resposta: o ETag já cobre as versões dos models, a URL absoluta
+    e o media type negociado; aqui entram de novo o esquema e o host (as URLs
+    dos hyperlinks dependem deles), o Accept e o escopo de autenticação.
+    """
+    scope = getattr(request.auth, 'scope', '') if request.auth is not None else 'anon'
+    accept = request.META.get('HTTP_ACCEPT', '')
+    raw = '|'.join((etag, request.scheme, request.get_host(), accept, scope))
+    return f'{PREFIX}:{hashlib.sha1(raw.encode()).hexdigest()}'
+
+
+def count(event):
+    key = f'{PREFIX}:stats:{event}'
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # A chave expirou entre o add e o incr
+        cache.set(key, 1, timeout=None)
+
+
+def stats():
+    return {
+        event: cache.get(f'{PREFIX}:stats:{event}', 0)
+        for event in ('hits', 'misses', 'waits')
+    }
+
+
+metrics.register('response_cache', stats)
+
+
+# Retorno de get() para quem esperou, não viu a resposta chegar e também não
+# conseguiu o lock: gera a resposta sem ler nem gravar o cache
+UNCACHED = object()
+
+
+def get(key):
+    """
+    Resposta guardada em `key`. Em um miss, só quem pegar o lock segue para
+    gerar a resposta (retorna None com o lock); os demais esperam ela
+    aparecer no cache por até WAIT_TIMEOUT segundos e, se não aparecer,
+    tentam o lock de novo antes de desistir com UNCACHED.
+    """
+    cached = cache.get(key)
+    if cached is None and not cache.add(f'{key}:lock', 1, timeout=LOCK_TIMEOUT):
+        count('waits')
+        deadline = time.monotonic() + WAIT_TIMEOUT
+        while cached is None and time.monotonic() < deadline:
+            time.sleep(WAIT_INTERVAL)
+            cached = cache.get(key)
+        if cached is None and not cache.add(f'{key}:lock', 1, timeout=LOCK_TIMEOUT):
+            # O lock é de outra requisição: store()/release() daqui apagariam o dela
+            count('misses')
+            return UNCACHED
+    count('hits' if cached is not None else 'misses')
+    return cached
+
+
+def store(key, response):
+    cache.set(
+        key,
+        (response.status_code, response['Content-Type'], response.content),
+        timeout=settings.API_CACHE_TIMEOUT,
+    )
+    release(key)
+
+
+def release(key):
+    cache.delete(f'{key}:lock')
@@ -0,0 +1,54 @@
+from rest_framework.relations import HyperlinkedIdentityField, HyperlinkedRelatedField
+from rest_framework.reverse import reverse
+
+PK_PLACEHOLDER = '__pk__'
+
+
+def url_template(view_name, request, format=None, lookup_url_kwarg='pk', reverse_url=reverse):
+    """
+    (prefixo, sufixo) da rota `view_name` em volta do pk, resolvida uma vez
+    por requisição; None se o pk não aparecer na URL.
+    """
+    templates = getattr(request, '_request', request).__dict__.setdefault('_url_templates', {})
+    key = (view_name, lookup_url_kwarg, format)
+    if key not in templates:
+        url = reverse_url(view_name, kwargs={lookup_url_kwarg: PK_PLACEHOLDER}, request=request, format=format)
+        prefix, found, suffix = url.partition(PK_PLACEHOLDER)
+        templates[key] = (prefix, suffix) if found else None
+    return templates[key]
+
+
+def detail_url(view_name, pk, request):
+    """URL de detalhe de `pk` pelo template em cache de url_template."""
+    template = url_template(view_name, request)
+    if template is None:
+        return reverse(view_name, kwargs={'pk': pk}, request=request)
+    return f'{template[0]}{pk}{template[1]}'
+
+
+class CachedURLMixin:
+    """
+    Resolve a rota uma vez por requisição (com um pk de marcação) e monta
+    as URLs seguintes só formatando o pk no prefixo/sufixo já resolvidos.
+    Produz exatamente a mesma URL do reverse() do DRF para pks inteiros;
+    qualquer outro valor de lookup cai no caminho original.
+    """
+
+    def get_url(self, obj, view_name, request, format):
+        if hasattr(obj, 'pk') and obj.pk in (None, ''):
+            return None
+        lookup_value = getattr(obj, self.lookup_field)
+        template = None
+        if request is not None and isinstance(lookup_value, int):
+            template = url_template(view_name, request, format, self.lookup_url_kwarg, self.reverse)
+        if template is None:
+            return super().get_url(obj, view_name, request, format)
+        return f'{template[0]}{lookup_value}{template[1]}'
+
+
+class CachedHyperlinkedRelatedField(CachedURLMixin, HyperlinkedRelatedField):
+    pass
+
+
+class CachedHyperlinkedIdentityField(CachedURLMixin, HyperlinkedIdentityField):
+    pass
@@ -0,0 +1,76 @@
+import datetime
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError as DjangoValidationError
+from django.db import models
+from django.db.models.constants import LOOKUP_SEP
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+from core.search import search
+
+
+def lookup_field(model, lookup):
+    """Campo do model no fim de `lookup`, seguindo as relações; None se não houver."""
+    field = None
+    for name in lookup.split(LOOKUP_SEP):
+        try:
+            field = model._meta.get_field(name)
+        except FieldDoesNotExist:
+            break
+        if field.related_model is None:
+            break
+        model = field.related_model
+    return field
+
+
+def parse_temporal(field, value):
+    """
+    Data ou data e hora em ISO 8601 para o tipo do campo; num DateTimeField,
+    uma data sozinha vira o início do dia e valores sem fuso ganham o fuso
+    atual. Levanta ValueError se não der para ler.
+    """
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(value)
+        if isinstance(field, models.DateTimeField):
+            moment = datetime.datetime.combine(day, datetime.time())
+        else:
+            return day
+    if not isinstance(field, models.DateTimeField):
+        return moment.date()
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+class FieldFilterBackend(BaseFilterBackend):
+    """Filtros declarados na view em `filter_fields` (parâmetro -> lookup do ORM)."""
+
+    def filter_queryset(self, request, queryset, view):
+        for param, lookup in getattr(view, 'filter_fields', {}).items():
+            value = request.query_params.get(param)
+            if not value:
+                continue
+            field = lookup_field(queryset.model, lookup)
+            try:
+                if isinstance(field, models.DateField):
+                    queryset = queryset.filter(**{lookup: parse_temporal(field, value)})
+                else:
+                    queryset = queryset.filter(**{lookup: value})
+            except (ValueError, DjangoValidationError):
+                raise ValidationError({param: f'Valor inválido: {value}'})
+        return queryset
+
+
+class SearchFilterBackend(BaseFilterBackend):
+    """`?search=` no índice de busca textual do model (core.search)."""
+
+    def filter_queryset(self, request, queryset, view):
+        text = request.query_params.get('search', '').strip()
+        if text and getattr(queryset.model, 'search_fields', None):
+            queryset = search(queryset, text)
+        return queryset
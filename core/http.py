@@ -0,0 +1,58 @@
+import re
+
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+CHUNK_SIZE = 64 * 1024
+
+
+def parse_range(header, size):
+    """
+    (início, fim) inclusivos de um `Range: bytes=` com um único intervalo.
+    None se não houver Range utilizável; ValueError se não couber no arquivo.
+    """
+    match = RANGE_RE.match((header or '').strip())
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if not first:
+        # bytes=-N: os últimos N bytes
+        start, end = max(size - int(last), 0), size - 1
+    else:
+        start, end = int(first), min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError(header)
+    return start, end
+
+
+def read_chunks(f, length):
+    with f:
+        while length > 0:
+            chunk = f.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def file_response(request, path, content_type, headers=None):
+    """Serve `path` em streaming, com Content-Length e suporte a Range."""
+    size = path.stat().st_size
+    try:
+        byte_range = parse_range(request.META.get('HTTP_RANGE'), size)
+    except ValueError:
+        return HttpResponse(status=416, headers={'Content-Range': f'bytes */{size}'})
+
+    f = open(path, 'rb')
+    if byte_range is None:
+        response = FileResponse(f, content_type=content_type, headers=headers)
+    else:
+        start, end = byte_range
+        f.seek(start)
+        response = StreamingHttpResponse(
+            read_chunks(f, end - start + 1), status=206, content_type=content_type, headers=headers,
+        )
+        response['Content-Length'] = end - start + 1
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    response['Accept-Ranges'] = 'bytes'
+    return response
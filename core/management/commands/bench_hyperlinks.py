@@ -0,0 +1,56 @@
+import timeit
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+from rest_framework import serializers
+from rest_framework.relations import HyperlinkedRelatedField
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from characters.models import Character
+from core.fields import CachedHyperlinkedRelatedField
+
+"""
+Compara o campo BookSerializer.characters com o HyperlinkedRelatedField
+original: um livro com N personagens, renderizado R vezes com cada campo.
+"""
+
+
+def render_links(field_class, request, characters):
+    field = field_class(many=True, read_only=True, view_name='character-detail')
+    field.bind('characters', serializers.Serializer(context={'request': request}))
+    return field.to_representation(characters)
+
+
+class Command(BaseCommand):
+    help = 'Mede a renderização dos hyperlinks de BookSerializer.characters'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--characters', type=int, default=1000)
+        parser.add_argument('--repeat', type=int, default=20)
+
+    @override_settings(ALLOWED_HOSTS=['testserver'])
+    def handle(self, *args, **options):
+        characters = [Character(pk=pk) for pk in range(1, options['characters'] + 1)]
+
+        def new_request():
+            return Request(APIRequestFactory().get('/api/books/1/'))
+
+        original = render_links(HyperlinkedRelatedField, new_request(), characters)
+        cached = render_links(CachedHyperlinkedRelatedField, new_request(), characters)
+        if original != cached:
+            raise CommandError('as URLs geradas são diferentes')
+
+        results = {}
+        for label, field_class in (('HyperlinkedRelatedField', HyperlinkedRelatedField),
+                                   ('CachedHyperlinkedRelatedField', CachedHyperlinkedRelatedField)):
+            # Uma requisição nova a cada repetição, como em produção
+            seconds = timeit.timeit(
+                lambda: render_links(field_class, new_request(), characters),
+                number=options['repeat'],
+            )
+            results[label] = seconds / options['repeat']
+            print(f"{label:<32}{results[label] * 1000:>10.2f} ms por livro")
+
+        speedup = results['HyperlinkedRelatedField'] / results['CachedHyperlinkedRelatedField']
+        print(f">>> {options['characters']} links idênticos, {speedup:.1f}x mais rápido")
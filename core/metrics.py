@@ -0,0 +1,10 @@
+# Nome -> função que devolve os contadores expostos em /api/metrics/
+PROVIDERS = {}
+
+
+def register(name, provider):
+    PROVIDERS[name] = provider
+
+
+def collect():
+    return {name: provider() for name, provider in PROVIDERS.items()}
@@ -0,0 +1,12 @@
+from django.db import models
+from django.utils import timezone
+
+
+class ResourceVersion(models.Model):
+    """Contador de versão de cada model da API; muda a cada escrita."""
+    label = models.CharField(max_length=100, primary_key=True)
+    version = models.PositiveBigIntegerField(default=0)
+    modified = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f'{self.label}@{self.version}'
@@ -0,0 +1,47 @@
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+MAX_PAGE_SIZE = 100
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Paginação por cursor sobre o `id` (a ordenação padrão dos modelos):
+    cada página é um `WHERE id > ? LIMIT n`, sem COUNT(*) nem OFFSET.
+    """
+    ordering = 'id'
+    page_size_query_param = 'page_size'
+    max_page_size = MAX_PAGE_SIZE
+
+
+class HybridPagination(PageNumberPagination):
+    """
+    Mantém a paginação por número de página como padrão e troca para
+    KeysetPagination quando a requisição pede (`?pagination=cursor`) ou
+    já traz um `?cursor=`.
+    """
+    page_size_query_param = 'page_size'
+    max_page_size = MAX_PAGE_SIZE
+    keyset_class = KeysetPagination
+
+    keyset = None
+
+    def wants_keyset(self, request):
+        params = request.query_params
+        return params.get('pagination') == 'cursor' or self.keyset_class.cursor_query_param in params
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.wants_keyset(request):
+            self.keyset = self.keyset_class()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def get_schema_operation_parameters(self, view):
+        return super().get_schema_operation_parameters(view) + [
+            parameter for parameter in self.keyset_class().get_schema_operation_parameters(view)
+            if parameter['name'] == self.keyset_class.cursor_query_param
+        ]
@@ -0,0 +1,93 @@
+import atexit
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+
+class Saturated(Exception):
+    """O pool e a fila estão cheios há mais de `max_wait` segundos."""
+
+
+class TimedOut(Saturated):
+    """A tarefa passou de `timeout` segundos; a vaga fica presa até o worker terminar."""
+
+
+class BoundedProcessPool:
+    """
+    ProcessPoolExecutor com fila limitada: no máximo `workers + queue_size`
+    tarefas ao mesmo tempo; quem não consegue vaga em `max_wait` segundos
+    recebe Saturated em vez de ficar preso no worker da requisição, e quem
+    espera mais de `timeout` segundos pelo resultado recebe TimedOut.
+    Os processos usam spawn e só sobem na primeira tarefa.
+    """
+
+    def __init__(self, workers, queue_size, max_wait, timeout=None):
+        self.workers = max(1, workers)
+        self.max_wait = max_wait
+        self.timeout = timeout
+        self.slots = threading.BoundedSemaphore(self.workers + max(0, queue_size))
+        self.executor = None
+        self.lock = threading.Lock()
+        self.counters = {'depth': 0, 'completed': 0, 'failed': 0, 'rejected': 0, 'timed_out': 0, 'latency_total': 0.0, 'latency_max': 0.0}
+
+    def get_executor(self):
+        with self.lock:
+            if self.executor is None:
+                self.executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context('spawn'),
+                )
+                atexit.register(self.executor.shutdown)
+            return self.executor
+
+    def count(self, **changes):
+        with self.lock:
+            for key, value in changes.items():
+                self.counters[key] += value
+
+    def run(self, fn, *args):
+        """Executa `fn(*args)` num processo do pool e espera o resultado."""
+        if not self.slots.acquire(timeout=self.max_wait):
+            self.count(rejected=1)
+            raise Saturated()
+        self.count(depth=1)
+        start = time.perf_counter()
+        try:
+            future = self.get_executor().submit(fn, *args)
+            result = future.result(timeout=self.timeout)
+        except TimeoutError:
+            # A requisição desiste, mas o worker segue com a tarefa: a vaga só
+            # volta quando ele terminar, senão a próxima ficaria na fila atrás dela
+            self.count(timed_out=1)
+            future.add_done_callback(lambda _: self.release(start))
+            raise TimedOut()
+        except Exception:
+            self.count(failed=1)
+            self.release(start)
+            raise
+        self.count(completed=1)
+        self.release(start)
+        return result
+
+    def release(self, start):
+        elapsed = time.perf_counter() - start
+        with self.lock:
+            self.counters['depth'] -= 1
+            self.counters['latency_total'] += elapsed
+            self.counters['latency_max'] = max(self.counters['latency_max'], elapsed)
+        self.slots.release()
+
+    def stats(self):
+        with self.lock:
+            c = dict(self.counters)
+        finished = c['completed'] + c['failed']
+        return {
+            'workers': self.workers,
+            'queue_depth': c['depth'],
+            'completed': c['completed'],
+            'failed': c['failed'],
+            'rejected': c['rejected'],
+            'timed_out': c['timed_out'],
+            'latency_avg_ms': round(1000 * c['latency_total'] / finished, 1) if finished else 0,
+            'latency_max_ms': round(1000 * c['latency_max'], 1),
+        }
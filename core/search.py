@@ -0,0 +1,107 @@
+from django.db import connections
+from django.db.migrations.operations.base import Operation
+from django.db.models.expressions import RawSQL
+
+# Busca textual dos models com `search_fields`:
+# - SQLite: tabela FTS5 `<tabela>_search` (rowid = pk), atualizada pelos
+#   signals de save/delete e pela importação;
+# - Postgres: índice GIN sobre o tsvector das colunas, mantido pelo próprio banco.
+
+
+def fts_table(table):
+    return f'{table}_search'
+
+
+def pg_document(columns):
+    text = " || ' ' || ".join(f'coalesce("{column}"::text, \'\')' for column in columns)
+    return f"to_tsvector('simple', {text})"
+
+
+def create_sql(vendor, table, columns):
+    cols = ', '.join(f'"{column}"' for column in columns)
+    if vendor == 'sqlite':
+        return [
+            f'CREATE VIRTUAL TABLE "{fts_table(table)}" USING fts5({cols})',
+            f'INSERT INTO "{fts_table(table)}"(rowid, {cols}) SELECT "id", {cols} FROM "{table}"',
+        ]
+    if vendor == 'postgresql':
+        return [f'CREATE INDEX "{table}_search_idx" ON "{table}" USING gin ({pg_document(columns)})']
+    return []
+
+
+def drop_sql(vendor, table):
+    if vendor == 'sqlite':
+        return [f'DROP TABLE IF EXISTS "{fts_table(table)}"']
+    if vendor == 'postgresql':
+        return [f'DROP INDEX IF EXISTS "{table}_search_idx"']
+    return []
+
+
+class CreateSearchIndex(Operation):
+    """Cria o índice de busca de `table` sobre `columns`, conforme o banco."""
+    reduces_to_sql = True
+    reversible = True
+
+    def __init__(self, table, columns):
+        self.table = table
+        self.columns = list(columns)
+
+    def deconstruct(self):
+        return self.__class__.__name__, [self.table, self.columns], {}
+
+    def state_forwards(self, app_label, state):
+        pass
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        for sql in create_sql(schema_editor.connection.vendor, self.table, self.columns):
+            schema_editor.execute(sql)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        for sql in drop_sql(schema_editor.connection.vendor, self.table):
+            schema_editor.execute(sql)
+
+    def describe(self):
+        return f'Cria o índice de busca de {self.table}'
+
+
+def search(queryset, text):
+    """Filtra `queryset` pelos registros cujas `search_fields` contêm os termos de `text`."""
+    model = queryset.model
+    table = model._meta.db_table
+    vendor = connections[queryset.db].vendor
+    if vendor == 'sqlite':
+        # Cada palavra vira um prefixo entre aspas: sem sintaxe do FTS5 vinda do cliente
+        terms = ' '.join('"{}"*'.format(word.replace('"', '""')) for word in text.split())
+        sql = f'SELECT rowid FROM "{fts_table(table)}" WHERE "{fts_table(table)}" MATCH %s'
+        return queryset.filter(pk__in=RawSQL(sql, [terms]))
+    if vendor == 'postgresql':
+        sql = (f'SELECT "id" FROM "{table}" '
+               f"WHERE {pg_document(model.search_fields)} @@ websearch_to_tsquery('simple', %s)")
+        return queryset.filter(pk__in=RawSQL(sql, [text]))
+    query = None
+    for field in model.search_fields:
+        condition = queryset.filter(**{f'{field}__icontains': text})
+        query = condition if query is None else query | condition
+    return query
+
+
+def refresh(model, pks=None):
+    """Regrava no FTS5 as linhas `pks` de `model` (todas se None). Só o SQLite precisa."""
+    connection = connections['default']
+    if connection.vendor != 'sqlite' or not getattr(model, 'search_fields', None):
+        return
+    table = model._meta.db_table
+    cols = ', '.join(f'"{column}"' for column in model.search_fields)
+    where, params = '', []
+    if pks is not None:
+        pks = list(pks)
+        if not pks:
+            return
+        where = f' WHERE "id" IN ({", ".join(["%s"] * len(pks))})'
+        params = pks
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM "{fts_table(table)}"' + where.replace('"id"', 'rowid'), params)
+        cursor.execute(
+            f'INSERT INTO "{fts_table(table)}"(rowid, {cols}) SELECT "id", {cols} FROM "{table}"' + where,
+            params,
+        )
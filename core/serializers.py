@@ -0,0 +1,79 @@
+from django.db.models import Prefetch
+from django.utils.module_loading import import_string
+from rest_framework import serializers
+from rest_framework.relations import ManyRelatedField, RelatedField
+
+
+def split_param(value):
+    return [name.strip() for name in (value or '').split(',') if name.strip()]
+
+
+class DynamicFieldsMixin:
+    """
+    Lê `?fields=`, `?exclude=` e `?expand=` da requisição do contexto.
+    `fields`/`exclude` removem campos da saída; `expand` troca o hyperlink
+    de um campo listado em `expandable_fields` (nome -> caminho do
+    serializer) pelo objeto serializado. Só vale para o serializer raiz:
+    os serializers expandidos são criados sem contexto.
+    """
+    expandable_fields = {}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self._context.get('request')
+        if request is None:
+            return
+        params = getattr(request, 'query_params', request.GET)
+
+        only = split_param(params.get('fields'))
+        exclude = set(split_param(params.get('exclude')))
+        for name in list(self.fields):
+            if (only and name not in only) or name in exclude:
+                self.fields.pop(name)
+
+        for name in split_param(params.get('expand')):
+            if name in self.fields and name in self.expandable_fields:
+                serializer_class = import_string(self.expandable_fields[name])
+                many = isinstance(self.fields[name], ManyRelatedField)
+                self.fields[name] = serializer_class(many=many, read_only=True)
+
+
+class EagerLoadingMixin:
+    """
+    Monta o queryset de acordo com os campos do serializer: relações M2M
+    viram um Prefetch que só carrega o pk (é o que o hyperlink precisa) e FKs
+    só entram em select_related quando o campo precisa do objeto inteiro,
+    já que HyperlinkedRelatedField usa direto a coluna `<campo>_id`.
+    Campos expandidos viram um Prefetch com o eager loading do serializer
+    aninhado, e as colunas que não aparecem na saída ficam em defer().
+    """
+
+    @classmethod
+    def setup_eager_loading(cls, queryset, context=None):
+        model = queryset.model
+        concrete = {f.name for f in model._meta.concrete_fields if not f.primary_key}
+        used, select, prefetch = set(), [], []
+
+        for field in cls(context=context or {}).fields.values():
+            if field.source == '*':
+                continue
+            used.add(field.source)
+            if isinstance(field, serializers.BaseSerializer):
+                child = getattr(field, 'child', field)
+                related = model._meta.get_field(field.source).related_model
+                nested = child.setup_eager_loading(related.objects.all())
+                prefetch.append(Prefetch(field.source, queryset=nested))
+            elif isinstance(field, ManyRelatedField):
+                related = model._meta.get_field(field.source).related_model
+                prefetch.append(Prefetch(field.source, queryset=related.objects.only('pk')))
+            elif isinstance(field, RelatedField) and not field.use_pk_only_optimization():
+                select.append(field.source)
+
+        deferred = concrete - used
+        if deferred:
+            queryset = queryset.defer(*deferred)
+        if select:
+            queryset = queryset.select_related(*select)
+        if prefetch:
+            queryset = queryset.prefetch_related(*prefetch)
+        return queryset
@@ -0,0 +1,30 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from core import search
+from core.versioning import VERSIONED_APPS, bump
+
+
+def versioned(model):
+    return model._meta.app_label in VERSIONED_APPS
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def bump_on_write(sender, **kwargs):
+    if versioned(sender):
+        bump(sender)
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def refresh_search_index(sender, instance, **kwargs):
+    if getattr(sender, 'search_fields', None):
+        search.refresh(sender, [instance.pk])
+
+
+@receiver(m2m_changed)
+def bump_on_link(sender, instance, action, model, **kwargs):
+    # A ligação aparece na saída dos dois lados da relação
+    if action.startswith('post_') and versioned(model):
+        bump(type(instance), model)
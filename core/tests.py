@@ -0,0 +1,159 @@
+import threading
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework import serializers
+from rest_framework.relations import HyperlinkedIdentityField, HyperlinkedRelatedField
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from characters.models import Character
+from characters.views import CharacterViewSet
+from houses.models import House
+from core import cache as response_cache
+from core.fields import CachedHyperlinkedIdentityField, CachedHyperlinkedRelatedField
+
+
+class CachedHyperlinkFieldTest(TestCase):
+    def setUp(self):
+        self.request = Request(APIRequestFactory().get('/api/books/1/'))
+        self.characters = [Character(pk=pk) for pk in (1, 42, 1000)]
+
+    def render(self, field_class, obj, **kwargs):
+        field = field_class(read_only=True, **kwargs)
+        field.bind('link', serializers.Serializer(context={'request': self.request}))
+        return field.to_representation(obj)
+
+    def test_related_field_matches_drf(self):
+        for view_name in ('character-detail', 'book-cover'):
+            for character in self.characters:
+                self.assertEqual(
+                    self.render(CachedHyperlinkedRelatedField, character, view_name=view_name),
+                    self.render(HyperlinkedRelatedField, character, view_name=view_name),
+                )
+
+    def test_identity_field_matches_drf_with_format(self):
+        field = CachedHyperlinkedIdentityField(view_name='character-detail')
+        field.bind('url', serializers.Serializer(context={'request': self.request}))
+        original = HyperlinkedIdentityField(view_name='character-detail')
+        original.bind('url', serializers.Serializer(context={'request': self.request}))
+        for character in self.characters:
+            self.assertEqual(
+                field.get_url(character, 'character-detail', self.request, 'json'),
+                original.get_url(character, 'character-detail', self.request, 'json'),
+            )
+
+    def test_api_output(self):
+        character = Character.objects.create(external_id=1, name="Test Character")
+        response = APIClient().get(f'/api/characters/{character.pk}/')
+        self.assertEqual(response.data['url'], f'http://testserver/api/characters/{character.pk}/')
+
+
+class ConditionalGetTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.character = Character.objects.create(external_id=1, name="Test Character")
+        self.url = f'/api/characters/{self.character.pk}/'
+
+    def test_if_none_match_returns_304_without_querying_data(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Last-Modified', response)
+        # Só a leitura das versões
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+    def test_if_modified_since(self):
+        last_modified = self.client.get(self.url)['Last-Modified']
+        response = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+
+    def test_etag_changes_on_save_and_m2m_change(self):
+        etag = self.client.get(self.url)['ETag']
+        self.character.name = "Renamed"
+        self.character.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['name'], "Renamed")
+
+        etag = response['ETag']
+        house = House.objects.create(external_id=1, name="Test House")
+        etag_after_house = self.client.get(self.url)['ETag']
+        self.assertNotEqual(etag, etag_after_house)
+        self.character.allegiances.add(house)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag_after_house)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['allegiances']), 1)
+
+    def test_etag_depends_on_url(self):
+        self.assertNotEqual(
+            self.client.get(self.url)['ETag'],
+            self.client.get(self.url, {'fields': 'name'})['ETag'],
+        )
+
+
+class ResponseCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.character = Character.objects.create(external_id=1, name="Test Character")
+        self.url = f'/api/characters/{self.character.pk}/'
+
+    def test_second_request_is_served_from_cache(self):
+        first = self.client.get(self.url)
+        self.assertEqual(first['X-Cache'], 'MISS')
+        # Só a leitura das versões
+        with self.assertNumQueries(1):
+            second = self.client.get(self.url)
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second['ETag'], first['ETag'])
+        stats = self.client.get('/api/metrics/').data['response_cache']
+        self.assertEqual((stats['hits'], stats['misses']), (1, 1))
+
+    def test_m2m_change_invalidates(self):
+        house = House.objects.create(external_id=1, name="Test House")
+        self.client.get(self.url)
+        self.character.allegiances.add(house)
+        response = self.client.get(self.url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(len(response.data['allegiances']), 1)
+
+    def test_accept_header_is_part_of_the_key(self):
+        self.client.get(self.url)
+        response = self.client.get(self.url, HTTP_ACCEPT='text/html')
+        self.assertEqual(response['X-Cache'], 'MISS')
+
+    @override_settings(ALLOWED_HOSTS=['internal.local', 'api.example.com'])
+    def test_host_and_scheme_are_part_of_the_key(self):
+        self.client.get(self.url, HTTP_HOST='internal.local')
+        response = self.client.get(self.url, HTTP_HOST='api.example.com', secure=True)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertTrue(response.data['url'].startswith('https://api.example.com/'))
+
+    def test_waits_for_request_holding_the_lock(self):
+        key = 'api-response:test'
+        self.assertIsNone(response_cache.get(key))
+        # Outra requisição está gerando a resposta: espera em vez de gerar também
+        timer = threading.Timer(0.1, cache.set, (key, (200, 'application/json', b'{}')))
+        timer.start()
+        self.assertEqual(response_cache.get(key), (200, 'application/json', b'{}'))
+        self.assertEqual(response_cache.stats()['waits'], 1)
+
+    def test_waiter_that_gives_up_does_not_touch_the_lock(self):
+        key = 'api-response:test'
+        cache.add(f'{key}:lock', 'outra', timeout=None)
+        with patch.object(response_cache, 'WAIT_TIMEOUT', 0.1):
+            self.assertIs(response_cache.get(key), response_cache.UNCACHED)
+        self.assertEqual(cache.get(f'{key}:lock'), 'outra')
+
+    def test_unhandled_exception_releases_the_lock(self):
+        with patch.object(CharacterViewSet, 'retrieve', side_effect=RuntimeError), \
+                patch.object(response_cache, 'release', wraps=response_cache.release) as release:
+            with self.assertRaises(RuntimeError):
+                self.client.get(self.url)
+        release.assert_called_once()
+        self.assertEqual(self.client.get(self.url)['X-Cache'], 'MISS')
@@ -0,0 +1,41 @@
+import hashlib
+
+from django.db.models import F
+from django.utils import timezone
+
+from core.models import ResourceVersion
+
+# Apps cujos models entram nos ETags da API
+VERSIONED_APPS = ('books', 'characters', 'houses')
+
+
+def bump(*models):
+    """Incrementa a versão de cada model; usado pelos signals e pela importação."""
+    now = timezone.now()
+    for label in sorted({model._meta.label_lower for model in models}):
+        updated = ResourceVersion.objects.filter(label=label).update(
+            version=F('version') + 1, modified=now,
+        )
+        if not updated:
+            ResourceVersion.objects.get_or_create(label=label, defaults={'version': 1, 'modified': now})
+
+
+def validators(models, *extra):
+    """
+    (ETag, Last-Modified) a partir das versões de `models`. `extra` entra no
+    hash para separar representações diferentes da mesma URL.
+    """
+    labels = sorted({model._meta.label_lower for model in models})
+    rows = {
+        label: (version, modified)
+        for label, version, modified in ResourceVersion.objects.filter(label__in=labels)
+        .values_list('label', 'version', 'modified')
+    }
+    # O horário entra junto para a versão não se repetir se o banco for recriado
+    stamp = ';'.join(
+        f'{label}:{rows[label][0]}:{rows[label][1].timestamp()}' if label in rows else f'{label}:0'
+        for label in labels
+    )
+    digest = hashlib.sha1('|'.join((stamp, *extra)).encode()).hexdigest()
+    last_modified = max((modified for _, modified in rows.values()), default=None)
+    return f'"{digest}"', last_modified
@@ -0,0 +1,162 @@
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+from rest_framework.decorators import action
+from rest_framework.exceptions import APIException
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from core import cache, metrics
+from core.pagination import MAX_PAGE_SIZE
+from core.serializers import split_param
+from core.versioning import validators
+
+
+class EagerLoadingViewSetMixin:
+    """Aplica o eager loading do serializer nas listagens e no detalhe."""
+    eager_actions = ('list', 'retrieve', 'batch')
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        serializer_class = self.get_serializer_class()
+        if self.action in self.eager_actions and hasattr(serializer_class, 'setup_eager_loading'):
+            queryset = serializer_class.setup_eager_loading(queryset, self.get_serializer_context())
+        return queryset
+
+
+class MultiGetViewSetMixin:
+    """
+    Busca vários objetos numa requisição só: `?ids=1,2,3` na listagem ou
+    POST em `batch/` com `{"ids": [...]}`. Uma query `pk__in` e os
+    prefetches do serializer, sem paginação, até `max_batch_size` ids.
+    """
+    max_batch_size = MAX_PAGE_SIZE
+
+    def list(self, request, *args, **kwargs):
+        if 'ids' in request.query_params:
+            return self.multi_get(split_param(request.query_params['ids']))
+        return super().list(request, *args, **kwargs)
+
+    @action(detail=False, methods=['post'])
+    def batch(self, request):
+        ids = request.data.get('ids') if isinstance(request.data, dict) else None
+        if not isinstance(ids, list):
+            return Response({'error': 'Envie {"ids": [...]}'}, status=400)
+        return self.multi_get(ids)
+
+    def multi_get(self, ids):
+        try:
+            pks = list(dict.fromkeys(int(pk) for pk in ids))
+        except (TypeError, ValueError):
+            return Response({'error': 'ids devem ser inteiros'}, status=400)
+        if len(pks) > self.max_batch_size:
+            return Response({'error': f'No máximo {self.max_batch_size} ids por requisição'}, status=400)
+        queryset = self.filter_queryset(self.get_queryset()).filter(pk__in=pks)
+        serializer = self.get_serializer(queryset, many=True)
+        return Response(serializer.data)
+
+
+class EarlyResponse(APIException):
+    """Interrompe a view devolvendo `response` (304/412 ou resposta em cache)."""
+
+    def __init__(self, response):
+        self.response = response
+
+
+class ConditionalGetViewSetMixin:
+    """
+    GET condicional a partir das versões dos models em `version_models`
+    (os que aparecem na saída, inclusive via ?expand=). Com If-None-Match ou
+    If-Modified-Since batendo, responde 304 logo depois da autenticação,
+    sem rodar o queryset.
+    """
+    version_models = ()
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self.etag = self.last_modified = None
+        if request.method not in ('GET', 'HEAD') or not self.version_models:
+            return
+        self.etag, self.last_modified = validators(
+            self.version_models, request.build_absolute_uri(), request.accepted_media_type,
+        )
+        response = get_conditional_response(
+            request._request,
+            etag=self.etag,
+            last_modified=int(self.last_modified.timestamp()) if self.last_modified else None,
+        )
+        if response is not None:
+            raise EarlyResponse(Response(status=response.status_code))
+
+    def handle_exception(self, exc):
+        if isinstance(exc, EarlyResponse):
+            return exc.response
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        # Ações que calculam o próprio ETag (ex.: a capa) mantêm o delas
+        if getattr(self, 'etag', None) and response.status_code in (200, 304) and not response.has_header('ETag'):
+            response['ETag'] = self.etag
+            if self.last_modified:
+                response['Last-Modified'] = http_date(self.last_modified.timestamp())
+            patch_vary_headers(response, ['Accept'])
+        return response
+
+
+class CachedResponseViewSetMixin(ConditionalGetViewSetMixin):
+    """
+    Guarda no cache do Django a resposta renderizada das ações em
+    `cache_actions`. A chave parte do ETag, então qualquer escrita que muda
+    a versão de um model da resposta já leva a uma chave nova.
+    """
+    cache_actions = ('list', 'retrieve')
+
+    def initial(self, request, *args, **kwargs):
+        self.cache_key = None
+        super().initial(request, *args, **kwargs)
+        if self.etag is None or self.action not in self.cache_actions:
+            return
+        key = cache.response_key(request, self.etag)
+        cached = cache.get(key)
+        if cached is cache.UNCACHED:
+            return
+        if cached is None:
+            self.cache_key = key
+            return
+        status, content_type, content = cached
+        response = HttpResponse(content, status=status, content_type=content_type)
+        response['X-Cache'] = 'HIT'
+        raise EarlyResponse(response)
+
+    def handle_exception(self, exc):
+        try:
+            return super().handle_exception(exc)
+        except Exception:
+            # Exceção fora da DRF não passa pelo finalize_response: solta o lock aqui
+            self.release_cache_lock()
+            raise
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        key = getattr(self, 'cache_key', None)
+        if key is None:
+            return response
+        if response.status_code == 200 and isinstance(response, Response):
+            response['X-Cache'] = 'MISS'
+            response.add_post_render_callback(lambda rendered: cache.store(key, rendered))
+        else:
+            self.release_cache_lock()
+        return response
+
+    def release_cache_lock(self):
+        key, self.cache_key = getattr(self, 'cache_key', None), None
+        if key is not None:
+            cache.release(key)
+
+
+class MetricsView(APIView):
+    """Contadores registrados em core.metrics (cache de respostas, render das capas)."""
+
+    def get(self, request):
+        return Response(metrics.collect())
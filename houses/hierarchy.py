@@ -0,0 +1,50 @@
+# Caminho materializado da hierarquia de suserania (House.overlord): o path
+# de uma casa é o path do suserano seguido do próprio id com SEGMENT dígitos.
+# Só dígitos, para a ordem das strings ser a mesma em qualquer collation:
+# a subárvore de P é o intervalo [P, P + 1) e os suseranos saem do próprio path.
+
+SEGMENT = 8
+# O path é TEXT, mas a entrada do índice B-tree do PostgreSQL tem limite
+# (~2700 bytes): acima disso a gravação falharia com um erro obscuro
+MAX_DEPTH = 300
+
+
+class HierarchyTooDeep(ValueError):
+    """A cadeia de suseranos de uma casa passa de MAX_DEPTH níveis."""
+
+
+def check_depth(pk, depth):
+    if depth > MAX_DEPTH:
+        raise HierarchyTooDeep(f'casa {pk}: hierarquia de suserania com {depth} níveis (máximo {MAX_DEPTH})')
+
+
+def segment(pk):
+    return str(pk).zfill(SEGMENT)
+
+
+def build_paths(parents):
+    """{id: path} a partir de {id: id do suserano}; um ciclo vira raiz onde fecha."""
+    paths = {}
+    for pk in parents:
+        chain, seen = [], set()
+        node = pk
+        while node is not None and node not in paths and node not in seen:
+            seen.add(node)
+            chain.append(node)
+            node = parents.get(node)
+        prefix = paths[node] if node in paths else ''
+        for node in reversed(chain):
+            prefix += segment(node)
+            check_depth(node, len(prefix) // SEGMENT)
+            paths[node] = prefix
+    return paths
+
+
+def path_ids(path):
+    """Ids do path, da casa mais alta até a própria."""
+    return [int(path[i:i + SEGMENT]) for i in range(0, len(path), SEGMENT)]
+
+
+def subtree_bounds(path):
+    """(início, fim) do intervalo de paths da subárvore, fim exclusivo."""
+    return path, str(int(path) + 1).zfill(len(path))
@@ -0,0 +1,25 @@
+# Generated by Django 5.0.4 on 2026-10-18 08:52
+
+from django.db import migrations, models
+
+from core.search import CreateSearchIndex
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('characters', '0007_search_indexes'),
+        ('houses', '0003_house_fingerprint'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='house',
+            index=models.Index(fields=['region'], name='house_region_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='house',
+            index=models.Index(fields=['words'], name='house_words_idx'),
+        ),
+        CreateSearchIndex('houses_house', ['name', 'region', 'words', 'titles']),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.0.4 on 2026-10-18 08:56
+
+from django.db import migrations, models
+
+from houses.hierarchy import build_paths
+
+
+def fill_paths(apps, schema_editor):
+    House = apps.get_model('houses', 'House')
+    paths = build_paths(dict(House.objects.values_list('id', 'overlord_id')))
+    House.objects.bulk_update([House(pk=pk, path=path) for pk, path in paths.items()], ['path'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('houses', '0004_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='house',
+            name='path',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=400),
+        ),
+        migrations.RunPython(fill_paths, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.4 on 2026-10-18 09:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('houses', '0005_house_path'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='house',
+            name='path',
+            field=models.TextField(db_index=True, default='', editable=False),
+        ),
+    ]
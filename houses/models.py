@@ -1,4 +1,8 @@
 from django.db import models
+from django.db.models import Max, Value
+from django.db.models.functions import Concat, Length, Substr
+
+from houses import hierarchy
 
 """
 {
@@ -35,8 +39,40 @@ from django.db import models
 }
 """
 
+class HouseQuerySet(models.QuerySet):
+    def subtree(self, path):
+        """A casa de `path` e todas as suas vassalas: um intervalo no índice de path."""
+        start, end = hierarchy.subtree_bounds(path)
+        return self.filter(path__gte=start, path__lt=end)
+
+    def rebuild_paths(self, batch_size=500):
+        """Recalcula o path de todas as casas, gravando só os que mudaram."""
+        current = dict(self.model.objects.values_list('id', 'path'))
+        paths = hierarchy.build_paths(dict(self.model.objects.values_list('id', 'overlord_id')))
+        changed = [self.model(pk=pk, path=path) for pk, path in paths.items() if current[pk] != path]
+        self.model.objects.bulk_update(changed, ['path'], batch_size=batch_size)
+        return len(changed)
+
+    def reroot_orphans(self):
+        """
+        Vira raiz cada casa que perdeu o suserano sem passar pelo save (o
+        SET_NULL de um delete), cortando o prefixo do path da sua subárvore.
+        As mais fundas primeiro: a subárvore delas não contém as mais rasas.
+        """
+        orphans = (
+            self.model.objects.filter(overlord__isnull=True)
+            .annotate(path_length=Length('path')).filter(path_length__gt=hierarchy.SEGMENT)
+            .order_by('-path_length').values_list('path', flat=True)
+        )
+        for path in orphans:
+            self.model.objects.subtree(path).update(
+                path=Substr('path', len(path) - hierarchy.SEGMENT + 1),
+            )
+
+
 class House(models.Model):
     external_id = models.IntegerField(unique=True)
+    fingerprint = models.CharField(max_length=64, blank=True, null=True, editable=False)
     name = models.CharField(max_length=255)
     region = models.CharField(max_length=100, blank=True, null=True)
     coat_of_arms = models.TextField(blank=True, null=True)
@@ -77,8 +113,48 @@ class House(models.Model):
         blank=True
     )
 
+    # Caminho materializado na hierarquia de overlord (houses.hierarchy),
+    # mantido por update_path e pelo populate_db
+    path = models.TextField(default='', editable=False, db_index=True)
+
+    objects = HouseQuerySet.as_manager()
+
+    # Colunas do ?search= (core.search); as mesmas da migration que cria o índice
+    search_fields = ('name', 'region', 'words', 'titles')
+
     class Meta:
         ordering = ['id']
+        indexes = [
+            models.Index(fields=['region'], name='house_region_idx'),
+            models.Index(fields=['words'], name='house_words_idx'),
+        ]
 
     def __str__(self):
         return self.name
+
+    def update_path(self):
+        """Acerta o path desta casa e reescreve o prefixo da sua subárvore."""
+        # O path em memória pode estar velho se um suserano acima mudou
+        self.path = House.objects.values_list('path', flat=True).get(pk=self.pk)
+        parent = ''
+        if self.overlord_id:
+            parent = House.objects.filter(pk=self.overlord_id).values_list('path', flat=True).first() or ''
+        if self.path and parent.startswith(self.path):
+            # O novo suserano está na própria subárvore: o ciclo só se resolve recalculando tudo
+            House.objects.rebuild_paths()
+            self.path = House.objects.values_list('path', flat=True).get(pk=self.pk)
+            return
+        path = parent + hierarchy.segment(self.pk)
+        if path == self.path:
+            return
+        if self.path:
+            # A vassala mais funda da subárvore desce junto
+            deepest = House.objects.subtree(self.path).aggregate(length=Max(Length('path')))['length']
+            hierarchy.check_depth(self.pk, (deepest - len(self.path) + len(path)) // hierarchy.SEGMENT)
+            House.objects.subtree(self.path).update(
+                path=Concat(Value(path), Substr('path', len(self.path) + 1)),
+            )
+        else:
+            hierarchy.check_depth(self.pk, len(path) // hierarchy.SEGMENT)
+            House.objects.filter(pk=self.pk).update(path=path)
+        self.path = path
@@ -1,33 +1,44 @@
 from rest_framework import serializers
+from core.fields import CachedHyperlinkedIdentityField, CachedHyperlinkedRelatedField
+from core.serializers import DynamicFieldsMixin, EagerLoadingMixin
 from houses.models import House
 
-class HouseSerializer(serializers.HyperlinkedModelSerializer):
-    url = serializers.HyperlinkedIdentityField(
+class HouseSerializer(DynamicFieldsMixin, EagerLoadingMixin, serializers.HyperlinkedModelSerializer):
+    expandable_fields = {
+        'current_lord': 'characters.serializers.CharacterSerializer',
+        'heir': 'characters.serializers.CharacterSerializer',
+        'overlord': 'houses.serializers.HouseSerializer',
+        'founder': 'characters.serializers.CharacterSerializer',
+        'cadet_branches': 'houses.serializers.HouseSerializer',
+        'sworn_members': 'characters.serializers.CharacterSerializer',
+    }
+
+    url = CachedHyperlinkedIdentityField(
         view_name='house-detail',
         lookup_field='pk'
     )
-    current_lord = serializers.HyperlinkedRelatedField(
+    current_lord = CachedHyperlinkedRelatedField(
         view_name='character-detail',
         read_only=True
     )
-    heir = serializers.HyperlinkedRelatedField(
+    heir = CachedHyperlinkedRelatedField(
         view_name='character-detail',
         read_only=True
     )
-    overlord = serializers.HyperlinkedRelatedField(
+    overlord = CachedHyperlinkedRelatedField(
         view_name='house-detail',
         read_only=True
     )
-    founder = serializers.HyperlinkedRelatedField(
+    founder = CachedHyperlinkedRelatedField(
         view_name='character-detail',
         read_only=True
     )
-    cadet_branches = serializers.HyperlinkedRelatedField(
+    cadet_branches = CachedHyperlinkedRelatedField(
         many=True,
         view_name='house-detail',
         read_only=True
     )
-    sworn_members = serializers.HyperlinkedRelatedField(
+    sworn_members = CachedHyperlinkedRelatedField(
         many=True,
         view_name='character-detail',
         read_only=True
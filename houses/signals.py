@@ -0,0 +1,17 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from houses.models import House
+
+
+@receiver(post_save, sender=House)
+def update_path_on_save(sender, instance, raw=False, **kwargs):
+    if not raw:
+        instance.update_path()
+
+
+@receiver(post_delete, sender=House)
+def reroot_vassals_on_delete(sender, **kwargs):
+    # As vassalas ficaram sem suserano (SET_NULL) sem passar pelo save; num
+    # delete em lote a primeira chamada já acerta todas e as demais só consultam
+    House.objects.reroot_orphans()
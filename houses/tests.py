@@ -1,6 +1,13 @@
+from unittest.mock import patch
+
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework.test import APIClient
+from books.models import Book
+from characters.models import Character
+from houses import hierarchy
 from houses.models import House
 
 class HouseViewSetTest(TestCase):
@@ -25,8 +32,129 @@ class HouseViewSetTest(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.data['count'], 1)
 
+    def test_expanded_members_follow_book_deletes(self):
+        member = Character.objects.create(external_id=1, name="Test Character")
+        self.house.sworn_members.add(member)
+        book = Book.objects.create(
+            external_id=1, name="Test Book", isbn="1", authors=[], number_of_pages=1,
+            publisher="P", country="C", media_type="Hardcover", released="1996-08-01T00:00:00Z",
+        )
+        book.characters.add(member)
+        url = reverse('house-detail', args=[self.house.id])
+        first = self.client.get(url, {'expand': 'sworn_members'})
+        self.assertEqual(len(first.data['sworn_members'][0]['books']), 1)
+        # O delete em cascata apaga a ligação sem m2m_changed
+        book.delete()
+        response = self.client.get(url, {'expand': 'sworn_members'}, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['sworn_members'][0]['books'], [])
+
     def test_retrieve_house(self):
         url = reverse('house-detail', args=[self.house.id])
         response = self.client.get(url)
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.data['name'], "Test House")
+
+    def create_houses(self, total):
+        member, _ = Character.objects.get_or_create(external_id=1, defaults={'name': "Test Character"})
+        for i in range(House.objects.count(), total):
+            house = House.objects.create(external_id=100 + i, name=f"House {i}", overlord=self.house, current_lord=member)
+            house.sworn_members.add(member)
+            self.house.cadet_branches.add(house)
+
+    def test_list_query_count_is_flat(self):
+        url = reverse('house-list')
+        self.create_houses(2)
+        # versões (ETag), count, página e um prefetch para cadet_branches e sworn_members
+        with self.assertNumQueries(5):
+            self.client.get(url)
+        self.create_houses(10)
+        with self.assertNumQueries(5):
+            response = self.client.get(url)
+        self.assertEqual(len(response.data['results']), 10)
+        self.assertEqual(len(response.data['results'][0]['cadet_branches']), 9)
+
+    def test_batch(self):
+        self.create_houses(5)
+        ids = list(House.objects.values_list('id', flat=True))
+        # pk__in e um prefetch para cadet_branches e sworn_members
+        with self.assertNumQueries(3):
+            response = self.client.post(reverse('house-batch'), {'ids': ids}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 5)
+        self.assertEqual(self.client.post(reverse('house-batch'), {'ids': 1}, format='json').status_code, 400)
+
+    def test_filters(self):
+        self.create_houses(3)
+        url = reverse('house-list')
+        self.assertEqual(self.client.get(url, {'overlord': self.house.id}).data['count'], 2)
+        self.assertEqual(self.client.get(url, {'region': 'Test Region', 'words': 'Test Words'}).data['count'], 1)
+        self.assertEqual(self.client.get(url, {'search': 'house 2'}).data['count'], 1)
+
+
+class HouseHierarchyTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.baratheon = House.objects.create(external_id=1, name="Baratheon")
+        self.stark = House.objects.create(external_id=2, name="Stark", overlord=self.baratheon)
+        self.karstark = House.objects.create(external_id=3, name="Karstark", overlord=self.stark)
+        self.umber = House.objects.create(external_id=4, name="Umber", overlord=self.stark)
+
+    def test_tree(self):
+        response = self.client.get(reverse('house-tree', args=[self.stark.id]))
+        self.assertEqual(response.data['depth'], 1)
+        self.assertEqual([v['name'] for v in response.data['vassals_tree']], ["Karstark", "Umber"])
+        self.assertEqual(response.data['vassals_tree'][0]['vassals_tree'], [])
+
+    def test_liege_chain(self):
+        response = self.client.get(reverse('house-liege-chain', args=[self.karstark.id]))
+        self.assertEqual([h['name'] for h in response.data], ["Stark", "Baratheon"])
+
+    def test_moving_a_house_moves_its_subtree(self):
+        self.stark.overlord = None
+        self.stark.save()
+        self.karstark.refresh_from_db()
+        self.assertEqual(self.karstark.path, self.stark.path + f'{self.karstark.pk:08d}')
+        self.assertEqual(list(House.objects.subtree(self.baratheon.path)), [self.baratheon])
+
+        # Um ciclo (Baratheon vassala de Karstark) não entra em loop
+        self.baratheon.overlord = self.karstark
+        self.baratheon.save()
+        self.stark.overlord = self.baratheon
+        self.stark.save()
+        self.assertEqual(House.objects.filter(path='').count(), 0)
+        response = self.client.get(reverse('house-liege-chain', args=[self.umber.id]))
+        self.assertEqual(response.status_code, 200)
+
+    def test_depth_limit(self):
+        with patch.object(hierarchy, 'MAX_DEPTH', 3):
+            with self.assertRaisesMessage(hierarchy.HierarchyTooDeep, 'máximo 3'):
+                House.objects.create(external_id=5, name="Bolton", overlord=self.karstark)
+            # Mover Umber para baixo de Karstark leva a subárvore junto
+            self.umber.overlord = self.karstark
+            with self.assertRaises(hierarchy.HierarchyTooDeep):
+                self.umber.save()
+            with self.assertRaises(hierarchy.HierarchyTooDeep):
+                hierarchy.build_paths({1: None, 2: 1, 3: 2, 4: 3})
+
+    def test_delete_rebuilds_paths(self):
+        self.stark.delete()
+        self.karstark.refresh_from_db()
+        self.assertEqual(self.karstark.path, f'{self.karstark.pk:08d}')
+        self.assertEqual(House.objects.subtree(self.karstark.path).count(), 1)
+
+    def test_bulk_delete_reroots_only_orphans(self):
+        bolton = House.objects.create(external_id=5, name="Bolton", overlord=self.karstark)
+        rest = [House.objects.create(external_id=10 + i, name=f"Casa {i}") for i in range(20)]
+        with CaptureQueriesContext(connection) as ctx:
+            House.objects.filter(pk__in=[self.stark.pk, self.karstark.pk] + [h.pk for h in rest]).delete()
+        # Um update por subárvore órfã (Umber e Bolton), sem reconstruir a tabela
+        path_updates = [q for q in ctx.captured_queries if q['sql'].startswith('UPDATE "houses_house" SET "path"')]
+        self.assertEqual(len(path_updates), 2)
+        self.assertFalse(any('"houses_house"."overlord_id" FROM' in q['sql'] for q in ctx.captured_queries))
+        bolton.refresh_from_db()
+        self.umber.refresh_from_db()
+        self.assertEqual(bolton.path, f'{bolton.pk:08d}')
+        self.assertEqual(self.umber.path, f'{self.umber.pk:08d}')
+        self.assertEqual(House.objects.get(pk=self.baratheon.pk).path, f'{self.baratheon.pk:08d}')
@@ -1,11 +1,62 @@
 from rest_framework import viewsets
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from books.models import Book
+from characters.models import Character
+from houses import hierarchy
 from houses.models import House
 from houses.serializers import HouseSerializer
 from rest_framework.permissions import IsAuthenticated
 from oauth2_provider.contrib.rest_framework import OAuth2Authentication
+from core.views import CachedResponseViewSetMixin, EagerLoadingViewSetMixin, MultiGetViewSetMixin
 
-class HouseViewSet(viewsets.ModelViewSet):
+class HouseViewSet(CachedResponseViewSetMixin, MultiGetViewSetMixin, EagerLoadingViewSetMixin, viewsets.ModelViewSet):
     queryset = House.objects.all()
     serializer_class = HouseSerializer
+    # Book entra pelos links `books` dos personagens em ?expand=sworn_members
+    version_models = (House, Character, Book)
+    cache_actions = ('list', 'retrieve', 'tree', 'liege_chain')
+    filter_fields = {
+        'region': 'region',
+        'words': 'words',
+        'overlord': 'overlord',
+    }
     # authentication_classes = [OAuth2Authentication]
     # permission_classes = [IsAuthenticated]
+
+    @action(detail=True, methods=['get'])
+    def tree(self, request, pk=None):
+        """
+        A casa com todas as vassalas, aninhadas em `vassals_tree`. Segue só
+        `overlord`: as casas cadetes (`cadet_branches`) não entram na árvore.
+        """
+        house = self.get_object()
+        nodes = self.serialize_with_depth(House.objects.subtree(house.path).order_by('path'))
+        by_path = {}
+        for node, path in nodes:
+            node['vassals_tree'] = []
+            by_path[path] = node
+            parent = by_path.get(path[:-hierarchy.SEGMENT])
+            if parent is not None:
+                parent['vassals_tree'].append(node)
+        return Response(by_path[house.path])
+
+    @action(detail=True, methods=['get'], url_path='liege-chain')
+    def liege_chain(self, request, pk=None):
+        """
+        Os suseranos da casa, do mais próximo ao mais alto. Segue só
+        `overlord`: as casas de origem de uma cadete (`parent_houses`) não entram.
+        """
+        house = self.get_object()
+        ids = hierarchy.path_ids(house.path)[:-1]
+        nodes = self.serialize_with_depth(House.objects.filter(pk__in=ids).order_by('-path'))
+        return Response([node for node, _ in nodes])
+
+    def serialize_with_depth(self, queryset):
+        """[(dados, path)] de cada casa, com `depth` = nível na hierarquia (0 = sem suserano)."""
+        context = self.get_serializer_context()
+        houses = list(HouseSerializer.setup_eager_loading(queryset, context).defer(None))
+        data = HouseSerializer(houses, many=True, context=context).data
+        for node, house in zip(data, houses):
+            node['depth'] = len(house.path) // hierarchy.SEGMENT - 1
+        return [(node, house.path) for node, house in zip(data, houses)]